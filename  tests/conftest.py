@@ -3,10 +3,22 @@ from pathlib import Path
 import pytest
 from pyfakefs.fake_filesystem import FakeFilesystem
 
+from services import history_service as history_module
 from services.history_service import HistoryService
 from services.linux_console import LinuxConsoleService
 
 
+@pytest.fixture(autouse=True)
+def fake_descriptors(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    У файлов pyfakefs fileno фальшивый, и ядро по нему скопировало бы (или отправило) совсем не тот файл.
+    В тестах на pyfakefs запрещаем пути через ядро (reflink, copy_file_range, sendfile, inotify).
+    """
+    if "fs" in request.fixturenames:
+        for module in ("src.utils.copy", "src.utils.cat", "src.utils.follow"):
+            monkeypatch.setattr(f"{module}.kernel_copy_allowed", lambda f: False)
+
+
 @pytest.fixture
 def fake_system(fs: FakeFilesystem) -> FakeFilesystem:
     fs.create_dir("/home/test/data1")
@@ -33,4 +45,5 @@ def linux_console(fake_system: FakeFilesystem) -> LinuxConsoleService:
 
 @pytest.fixture
 def history_service(fake_system: FakeFilesystem) -> HistoryService:
+    fake_system.create_dir(Path(history_module.__file__).parent.parent.parent)
     return HistoryService()
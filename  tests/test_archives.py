@@ -2,6 +2,8 @@ from pathlib import Path
 
 import pytest
 
+from src.utils.progress import Progress
+
 def test_make_success(linux_console):
     linux_console.archive("zip", "/home/test/data1", "/home/test/archive.zip")
     assert Path("/home/test/archive.zip").exists()
@@ -42,3 +44,22 @@ def test_unpack_e_invalid_format(linux_console, fake_system):
     fake_system.create_file("invalid_format.FAIL")
     with pytest.raises(OSError, match="неправильный или сломанный формат архива"):
         linux_console.unpack_archive("zip", "invalid_format.FAIL")
+
+
+def test_make_tar_progress(linux_console, fake_system):
+    progress = Progress("tar")
+    linux_console.archive("tar", "/home/test/data1", "/home/archive.tar", progress)
+    linux_console.unpack_archive("tar", "/home/archive.tar")
+
+    assert (progress.files, progress.bytes) == (3, 12)
+    assert Path("/home/test/test1.txt").read_text() == "TEST 1"
+
+
+def test_make_zip_progress_render(linux_console):
+    lines = []
+    progress = Progress("zip", lines.append, interval=0)
+    linux_console.archive("zip", "/home/test/data1", "/home/test/archive.zip", progress)
+
+    assert progress.total_files == 3
+    assert "файлов 3/3" in lines[-1]
+    assert progress.finish().startswith("zip: 3 файлов, 12 B")
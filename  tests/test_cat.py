@@ -1,8 +1,12 @@
+import io
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
 from enums.file_mode import FileReadMode
+from services.linux_console import LinuxConsoleService
 
 
 def test_success_default(linux_console):
@@ -44,3 +48,121 @@ def test_e_dir(linux_console):
 def test_e_not_permission(linux_console, fake_system):
     with pytest.raises(PermissionError):
         linux_console.cat("no_access.txt")
+
+
+def test_stream_range(linux_console, fs):
+    fs.create_file("/home/lines.txt", contents="".join(f"line {i}\n" for i in range(1000)))
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/lines.txt", out, tail=3, chunk_size=16)
+    assert out.getvalue() == b"line 997\nline 998\nline 999\n"
+
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/lines.txt", out, FileReadMode.bytes, head=2, chunk_size=16)
+    assert out.getvalue() == b"line 0\nline 1\n"
+
+    out = io.BytesIO()
+    written = linux_console.cat_stream("/home/lines.txt", out, offset=7, length=6, chunk_size=4)
+    assert (written, out.getvalue()) == (6, b"line 1")
+
+
+def test_stream_whole_file(linux_console):
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/test/testD.txt", out, chunk_size=4)
+    assert out.getvalue() == b"TEST D"
+
+
+def test_e_stream_not_utf8(linux_console, fs):
+    fs.create_file("/home/binary", contents=b"\xff\xfe")
+    with pytest.raises(OSError):
+        linux_console.cat_stream("/home/binary", io.BytesIO())
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/binary", out, FileReadMode.bytes)
+    assert out.getvalue() == b"\xff\xfe"
+
+
+def test_e_stream_range(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.cat_stream("/home/test/testD.txt", io.BytesIO(), head=1, tail=1)
+    with pytest.raises(ValueError):
+        linux_console.cat_stream("/home/test/testD.txt", io.BytesIO(), offset=-1)
+
+
+def follow_in_thread(linux_console, path, out, stop, **kwargs):
+    thread = threading.Thread(target=linux_console.cat_stream, args=(path, out), kwargs={"follow": True, "stop": stop, **kwargs})
+    thread.start()
+    return thread
+
+
+def wait_for(out, expected):
+    deadline = time.monotonic() + 5
+    while out.getvalue() != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert out.getvalue() == expected
+
+
+def test_follow_real_fs(tmp_path):
+    log = tmp_path / "shell.log"
+    log.write_bytes(b"old\n")
+    out, stop = io.BytesIO(), threading.Event()
+    thread = follow_in_thread(LinuxConsoleService(), log, out, stop)
+    try:
+        wait_for(out, b"old\n")
+        with open(log, "ab") as f:
+            f.write(b"new\n")
+        wait_for(out, b"old\nnew\n")
+
+        log.write_bytes(b"cut\n")
+        wait_for(out, b"old\nnew\ncut\n")
+
+        log.rename(tmp_path / "shell.log.1")
+        log.write_bytes(b"rotated\n")
+        wait_for(out, b"old\nnew\ncut\nrotated\n")
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_follow_polling(linux_console, fs):
+    fs.create_file("/home/app.log", contents="1\n2\n3\n")
+    out, stop = io.BytesIO(), threading.Event()
+    thread = follow_in_thread(linux_console, "/home/app.log", out, stop, tail=1)
+    try:
+        wait_for(out, b"3\n")
+        with open("/home/app.log", "a") as f:
+            f.write("4\n")
+        wait_for(out, b"3\n4\n")
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_e_follow_head(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.cat_stream("/home/test/testD.txt", io.BytesIO(), head=1, follow=True)
+
+
+def test_stream_non_ascii(linux_console, fs):
+    fs.create_file("/home/ru.txt", contents="привет\nмир\n".encode())
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/ru.txt", out, chunk_size=3)
+    assert out.getvalue().decode() == "привет\nмир\n"
+
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/ru.txt", out, length=3)
+    assert out.getvalue() == "привет".encode()[:3]
+
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/ru.txt", out, offset=1)
+    assert out.getvalue() == "привет\nмир\n".encode()[1:]
+
+    out = io.BytesIO()
+    linux_console.cat_stream("/home/ru.txt", out, tail=1)
+    assert out.getvalue().decode() == "мир\n"
+
+
+def test_e_stream_cut_utf8_prints_nothing(linux_console, fs):
+    fs.create_file("/home/cut.txt", contents="привет".encode()[:-1])
+    out = io.BytesIO()
+    with pytest.raises(OSError):
+        linux_console.cat_stream("/home/cut.txt", out)
+    assert out.getvalue() == b""
@@ -1,7 +1,14 @@
+import errno
+import os
+import shutil
 from pathlib import Path
 
 import pytest
 
+from services.linux_console import LinuxConsoleService
+from src.utils import copy as copy_module
+from src.utils.copy import copy_data
+
 def test_success_file(linux_console):
     linux_console.cp("/home/test/testD.txt", "/home/test/copy.txt", False)
     assert Path("/home/test/copy.txt").exists()
@@ -39,3 +46,128 @@ def test_e_without_recursive(linux_console):
 def test_e_no_access(linux_console):
     with pytest.raises(PermissionError):
         linux_console.cp("no_access.txt", "copy.txt", False)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_success_recursive_nested(linux_console, fake_system, jobs):
+    fake_system.create_file("/home/test/data1/sub/deep/test3.txt", contents="TEST 3")
+    linux_console.cp("/home/test/data1", "/home/test/data11", True, jobs)
+    assert Path("/home/test/data11/sub/deep/test3.txt").read_text() == "TEST 3"
+    assert Path("/home/test/data11/test1.txt").read_text() == "TEST 1"
+
+
+def test_e_into_itself(linux_console):
+    with pytest.raises(ValueError, match="в самого себя"):
+        linux_console.cp("/home/test/data1", "/home/test/data1/inner", True)
+
+
+def test_success_strategy_fake_fs(linux_console):
+    assert linux_console.cp("/home/test/testD.txt", "/home/test/copy.txt", False) == {"buffer": 1}
+
+
+def test_success_strategy_real_fs(tmp_path):
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    os.utime(src, (1_000_000, 1_000_000))
+
+    strategies = LinuxConsoleService().cp(src, tmp_path / "dst.bin", False, chunk_size=1024 * 1024)
+
+    assert set(strategies) <= {"reflink", "copy_file_range", "buffer"}
+    assert (tmp_path / "dst.bin").read_bytes() == src.read_bytes()
+    assert (tmp_path / "dst.bin").stat().st_mtime == 1_000_000
+
+
+def test_success_buffer_fallback(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EXDEV, "unsupported")
+
+    monkeypatch.setattr("src.utils.copy.fcntl.ioctl", unsupported)
+    monkeypatch.setattr("src.utils.copy.os.copy_file_range", unsupported)
+    (tmp_path / "src.txt").write_text("TEST" * 1000)
+
+    with open(tmp_path / "src.txt", "rb") as fsrc, open(tmp_path / "dst.txt", "wb") as fdst:
+        assert copy_data(fsrc, fdst, 64) == "buffer"
+    assert (tmp_path / "dst.txt").read_text() == "TEST" * 1000
+
+
+def test_success_resume(linux_console, fake_system, monkeypatch):
+    for n in range(5):
+        fake_system.create_file(f"/home/test/big/file{n}.txt", contents=f"FILE {n}")
+
+    copied = []
+    real_copy = copy_module.copy_file
+
+    def failing_copy(src, dst, *args):
+        if src.endswith("file3.txt"):
+            raise PermissionError("boom")
+        copied.append(src)
+        return real_copy(src, dst, *args)
+
+    monkeypatch.setattr(copy_module, "copy_file", failing_copy)
+    with pytest.raises(PermissionError):
+        linux_console.cp("/home/test/big", "/home/test/big2", True, resume=True)
+    assert Path("/home/test/.big2.cp-checkpoint").exists()
+
+    first = len(copied)
+    monkeypatch.setattr(copy_module, "copy_file", lambda src, dst, *args: copied.append(src) or real_copy(src, dst, *args))
+    strategies = linux_console.cp("/home/test/big", "/home/test/big2", True, resume=True)
+
+    assert strategies["skipped"] == first
+    assert len(copied) == 5
+    assert Path("/home/test/big2/file3.txt").read_text() == "FILE 3"
+    assert not Path("/home/test/.big2.cp-checkpoint").exists()
+
+
+def test_success_no_journal_without_resume(linux_console, monkeypatch):
+    def failing_copy(*args):
+        raise PermissionError("boom")
+
+    monkeypatch.setattr(copy_module, "copy_file", failing_copy)
+    with pytest.raises(PermissionError):
+        linux_console.cp("/home/test/data1", "/home/test/data11", True)
+    assert not Path("/home/test/.data11.cp-checkpoint").exists()
+
+
+def test_success_resume_recopies_changed_destination(linux_console, fake_system):
+    for n in range(2):
+        fake_system.create_file(f"/home/test/big/file{n}.txt", contents=f"FILE {n}")
+    fake_system.create_dir("/home/test/big2")
+    with copy_module.CopyCheckpoint("/home/test/big2") as checkpoint:
+        for n in range(2):
+            src_file, dst_file = f"/home/test/big/file{n}.txt", f"/home/test/big2/file{n}.txt"
+            copy_module.copy_file(src_file, dst_file)
+            checkpoint.record(dst_file, os.stat(src_file), os.stat(dst_file))
+    Path("/home/test/big2/file1.txt").write_text("BROKEN")
+
+    strategies = linux_console.cp("/home/test/big", "/home/test/big2", True, resume=True)
+    assert strategies["skipped"] == 1
+    assert Path("/home/test/big2/file1.txt").read_text() == "FILE 1"
+
+
+def test_success_resume_without_journal(linux_console):
+    linux_console.cp("/home/test/data1", "/home/test/data11", True)
+    assert linux_console.cp("/home/test/data1", "/home/test/data11", True, resume=True) == {"skipped": 3}
+    assert linux_console.cp("/home/test/testD.txt", "/home/test/data11", False, resume=True) == {"buffer": 1}
+    assert linux_console.cp("/home/test/testD.txt", "/home/test/data11", False, resume=True) == {"skipped": 1}
+
+
+def test_success_copy_file_range_returns_zero(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EOPNOTSUPP, "unsupported")
+
+    monkeypatch.setattr("src.utils.copy.fcntl.ioctl", unsupported)
+    monkeypatch.setattr("src.utils.copy.os.copy_file_range", lambda *args: 0)
+    (tmp_path / "src.txt").write_text("TEST" * 1000)
+
+    with open(tmp_path / "src.txt", "rb") as fsrc, open(tmp_path / "dst.txt", "wb") as fdst:
+        assert copy_data(fsrc, fdst, 64) == "buffer"
+    assert (tmp_path / "dst.txt").read_text() == "TEST" * 1000
+
+
+def test_e_fifo_in_tree(tmp_path):
+    (tmp_path / "tree").mkdir()
+    (tmp_path / "tree" / "file.txt").write_text("TEXT")
+    os.mkfifo(tmp_path / "tree" / "pipe")
+
+    with pytest.raises(shutil.SpecialFileError, match="named pipe"):
+        LinuxConsoleService().cp(tmp_path / "tree", tmp_path / "copy", True)
@@ -2,6 +2,8 @@ from pathlib import Path
 
 import pytest
 
+from services.linux_console import LinuxConsoleService
+
 
 def test_success_1(linux_console):
     res = linux_console.grep("TEST", Path("/home/test/testD.txt"), False, False)
@@ -53,3 +55,126 @@ def test_e_dir_without_recursive(linux_console):
 def test_e_invalid_pattern(linux_console):
     with pytest.raises(ValueError):
         linux_console.grep(")t", "/home/test/testD.txt", r=False, i=False)
+
+
+def test_success_iter_is_lazy(linux_console):
+    res = linux_console.grep_iter("TEST", "/home/test/data1", r=True, i=False)
+    assert not isinstance(res, list)
+    assert "TEST" in next(res)
+
+
+def test_success_max_count(linux_console, fake_system):
+    fake_system.create_file("many.txt", contents="TEST\n" * 10)
+    result = linux_console.grep("TEST", "many.txt", r=False, i=False, max_count=3)
+    assert len(result) == 3
+
+
+def test_success_max_count_recursive(linux_console):
+    result = linux_console.grep("TEST", ".", r=True, i=False, max_count=1)
+    assert len(result) == 1
+
+
+def test_e_negative_max_count(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.grep("TEST", "/home/test/testD.txt", r=False, i=False, max_count=-1)
+
+
+def test_success_parallel_same_order(tmp_path):
+    for d in range(5):
+        (tmp_path / f"dir{d}").mkdir()
+        for f in range(30):
+            (tmp_path / f"dir{d}" / f"file{f}.txt").write_text(f"TEST {d} {f}\nskip\nTEST again\n")
+    service = LinuxConsoleService()
+    sequential = service.grep("TEST", tmp_path, r=True, i=False)
+    parallel = service.grep("TEST", tmp_path, r=True, i=False, jobs=3)
+    assert len(sequential) == 300
+    assert parallel == sequential
+
+
+def test_e_zero_jobs(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.grep("TEST", "/home/test/data1", r=True, i=False, jobs=0)
+
+
+def test_success_binary_sniffed(linux_console, fake_system):
+    fake_system.create_file("/home/test/data2/blob", contents=b"\x7fELF\x00\x01TEST\x00")
+    fake_system.create_file("/home/test/data2/other", contents=b"\x7fELF\x00\x01\x02")
+    res = linux_console.grep("TEST", "/home/test/data2", r=True, i=False)
+    assert res == ["grep: blob: двоичный файл совпадает\n"]
+
+
+def test_success_binary_suffix_without_match(linux_console, fake_system):
+    fake_system.create_file("/home/test/data2/image.png", contents="no match here")
+    res = linux_console.grep("TEST", "/home/test/data2", r=True, i=False)
+    assert res == []
+
+
+def test_success_large_binary_mmap(tmp_path):
+    (tmp_path / "big.bin").write_bytes(b"\x00" * 100_000 + b"NEEDLE" + b"\x00" * 100_000)
+    service = LinuxConsoleService()
+    assert service.grep("NEE+DLE", tmp_path, r=True, i=False) == ["grep: big.bin: двоичный файл совпадает\n"]
+    assert service.grep("HAY", tmp_path, r=True, i=False) == []
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_success_large_text_mmap(tmp_path, monkeypatch, newline):
+    monkeypatch.setattr("src.utils.grep.GREP_MMAP_THRESHOLD", 1024)
+    monkeypatch.setattr("src.utils.grep.GREP_CHUNK_SIZE", 100)
+    # \r\n не должен уводить файл с быстрого пути в построчное чтение
+    monkeypatch.setattr("src.utils.grep.grep_text_lines", None)
+    lines = [f"line {n} {'TEST' if n % 7 == 0 else 'skip'}{newline}" for n in range(1, 5000)]
+    file = tmp_path / "big.log"
+    file.write_bytes("".join(lines).encode())
+
+    res = LinuxConsoleService().grep("^line \\d+ TEST$", file, r=False, i=False)
+    expected = [f"{file}:{n}:line {n} TEST\n" for n in range(7, 5000, 7)]
+    assert res == expected
+
+
+def test_success_fixed_strings(linux_console, fake_system):
+    fake_system.create_file("dots.txt", contents="a.b\naxb\n")
+    assert linux_console.grep("a.b", "dots.txt", r=False, i=False) == ["dots.txt:1:a.b\n", "dots.txt:2:axb\n"]
+    assert linux_console.grep("a.b", "dots.txt", r=False, i=False, fixed=True) == ["dots.txt:1:a.b\n"]
+
+
+def test_success_fixed_strings_ignore(linux_console, fake_system):
+    fake_system.create_file("dots.txt", contents="A.B\naxb\n")
+    assert linux_console.grep("a.b", "dots.txt", r=False, i=True, fixed=True) == ["dots.txt:1:A.B\n"]
+
+
+def test_success_literal_line_numbers(linux_console, fake_system):
+    fake_system.create_file("log.txt", contents="ok\nERROR one ERROR\nok\r\nok\nERROR two")
+    res = linux_console.grep("ERROR", "log.txt", r=False, i=False)
+    assert res == ["log.txt:2:ERROR one ERROR\n", "log.txt:5:ERROR two"]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_success_literal_large_mmap(tmp_path, monkeypatch, newline):
+    monkeypatch.setattr("src.utils.grep.GREP_MMAP_THRESHOLD", 1024)
+    monkeypatch.setattr("src.utils.grep.GREP_CHUNK_SIZE", 100)
+    monkeypatch.setattr("src.utils.grep.grep_text_lines", None)
+    file = tmp_path / "big.log"
+    file.write_bytes("".join(f"{n} {'ERROR' if n % 9 == 0 else 'INFO'}{newline}" for n in range(1, 5000)).encode())
+
+    res = LinuxConsoleService().grep("ERROR", file, r=False, i=False)
+    assert res == [f"{file}:{n}:{n} ERROR\n" for n in range(9, 5000, 9)]
+
+
+@pytest.mark.parametrize("pattern", ["^$", r"^\s*$"])
+def test_success_empty_lines(linux_console, fs, pattern):
+    fs.create_file("/home/a.txt", contents="abc\n\nfoo\n")
+    assert linux_console.grep(pattern, "/home/a.txt", r=False, i=False) == ["/home/a.txt:2:\n"]
+
+
+def test_success_literal_lone_cr_after_match(linux_console, fs):
+    fs.create_file("/home/cr.txt", contents=b"ERROR a\r\nok\rERROR b\nERROR c")
+    assert linux_console.grep("ERROR", "/home/cr.txt", r=False, i=False) == [
+        "/home/cr.txt:1:ERROR a\n", "/home/cr.txt:3:ERROR b\n", "/home/cr.txt:4:ERROR c",
+    ]
+
+
+@pytest.mark.parametrize("pattern", ["foo", "^b", "^$"])
+def test_success_cr_line_breaks(linux_console, fs, pattern):
+    fs.create_file("/home/cr.txt", contents=b"abc\rbar\r\rfoo\r\nbaz")
+    expected = {"foo": ["/home/cr.txt:4:foo\n"], "^b": ["/home/cr.txt:2:bar\n", "/home/cr.txt:5:baz"], "^$": ["/home/cr.txt:3:\n"]}
+    assert linux_console.grep(pattern, "/home/cr.txt", r=False, i=False) == expected[pattern]
@@ -0,0 +1,126 @@
+import errno
+from pathlib import Path
+
+import pytest
+
+
+def test_success_add_ids(history_service):
+    history_service.add("ls")
+    history_service.add("cd ..")
+    assert history_service.get(-1) == ["2 cd ..\n", "1 ls\n"]
+
+
+def test_success_ids_continue_after_restart(history_service):
+    history_service.history_file.write_text("1 ls\n2 cd ..\n41 cat a.txt\n")
+    restarted = type(history_service)()
+    restarted.add("pwd")
+    assert restarted.get(1) == ["42 pwd\n"]
+
+
+def test_success_ids_without_numbers(history_service):
+    history_service.history_file.write_text("ls\ncd ..\n")
+    restarted = type(history_service)()
+    restarted.add("pwd")
+    assert restarted.get(1) == ["3 pwd\n"]
+
+
+def test_success_get_tail(history_service, monkeypatch):
+    monkeypatch.setattr("services.history_service.HISTORY_BLOCK_SIZE", 7)
+    history_service.history_file.write_text("".join(f"{n} echo {n}\n" for n in range(1, 101)))
+    assert history_service.get(3) == ["100 echo 100\n", "99 echo 99\n", "98 echo 98\n"]
+    assert history_service.get(0) == []
+
+
+def test_success_get_more_than_exists(history_service):
+    history_service.add("ls")
+    history_service.add("pwd")
+    assert history_service.get(10) == history_service.get(-1) == ["2 pwd\n", "1 ls\n"]
+
+
+def fill(history_service, *commands):
+    for command in commands:
+        history_service.add(command)
+
+
+def test_success_search_substring(history_service):
+    fill(history_service, "ls", "cp a.txt b.txt", "cat a.txt", "rm b.txt")
+    assert history_service.search("a.txt") == ["3 cat a.txt\n", "2 cp a.txt b.txt\n"]
+
+
+def test_success_search_regex(history_service):
+    fill(history_service, "ls -l", "cp a b", "ls -a", "lsblk")
+    assert history_service.search(r"^ls\b", regex=True) == ["3 ls -a\n", "1 ls -l\n"]
+
+
+def test_success_search_command_unique(history_service):
+    fill(history_service, "cp a b", "ls", "cp c d", "cp a b", "cat a")
+    assert history_service.search(command="cp", unique=True) == ["4 cp a b\n", "3 cp c d\n"]
+    assert history_service.search("a", command="cp") == ["4 cp a b\n", "1 cp a b\n"]
+
+
+def test_success_search_sees_new_commands(history_service):
+    fill(history_service, "ls")
+    assert history_service.search("pwd") == []
+    fill(history_service, "pwd")
+    assert history_service.search("pwd", length=1) == ["2 pwd\n"]
+
+
+def test_e_search_invalid_regex(history_service):
+    with pytest.raises(ValueError):
+        history_service.search(")x", regex=True)
+
+
+def test_success_rotation(history_service):
+    # По умолчанию старые сегменты не удаляются: history -1 видит все команды
+    service = type(history_service)(max_entries=3, max_bytes=None)
+    fill(service, *(f"echo {n}" for n in range(1, 9)))
+
+    assert [segment.name for segment in service.segments()] == [
+        ".history-000000000001-000000000003.gz",
+        ".history-000000000004-000000000006.gz",
+    ]
+    assert service.history_file.read_text() == "7 echo 7\n8 echo 8\n"
+    assert service.get(4) == ["8 echo 8\n", "7 echo 7\n", "6 echo 6\n", "5 echo 5\n"]
+    assert len(service.get(-1)) == 8
+    assert service.search("echo 2") == ["2 echo 2\n"]
+
+
+def test_success_rotation_keeps_ids(history_service):
+    service = type(history_service)(max_entries=2, max_bytes=None, compress=False)
+    fill(service, "ls", "pwd")
+    assert service.history_file.read_text() == ""
+
+    restarted = type(history_service)(max_entries=2, max_bytes=None, compress=False)
+    restarted.add("cat a.txt")
+    assert restarted.get(1) == ["3 cat a.txt\n"]
+
+
+def test_success_rotation_prunes_segments(history_service):
+    service = type(history_service)(max_entries=None, max_bytes=20, keep_segments=2)
+    fill(service, *(f"command number {n}" for n in range(1, 7)))
+    assert len(service.segments()) == 2
+    assert service.get(-1)[-1] == "3 command number 3\n"
+
+
+def test_success_search_after_rotation(history_service):
+    service = type(history_service)(max_entries=3, max_bytes=None)
+    fill(service, "ls", "cp a b")
+    assert service.search(command="cp") == ["2 cp a b\n"]
+    fill(service, "rm a", "cp c d", "cp e f")
+    assert service.search(command="cp") == ["5 cp e f\n", "4 cp c d\n", "2 cp a b\n"]
+
+
+def test_success_backup_renames(history_service):
+    backup = history_service.backup(Path("/home/test/data1"))
+    assert not Path("/home/test/data1").exists()
+    assert (backup / "test1.txt").read_text() == "TEST 1"
+
+
+def test_success_backup_copies_across_devices(history_service, monkeypatch):
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr("services.history_service.os.rename", cross_device)
+    backup = history_service.backup(Path("/home/test/testD.txt"))
+    assert Path("/home/test/testD.txt").exists()
+    assert backup.read_text() == "TEST D"
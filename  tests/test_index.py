@@ -0,0 +1,96 @@
+import os
+import random
+import sqlite3
+import string
+from pathlib import Path
+
+import pytest
+
+from services.linux_console import LinuxConsoleService
+from utils import trigram_index
+from utils.trigram_index import TrigramIndex
+
+
+@pytest.fixture
+def indexed(tmp_path: Path) -> tuple[LinuxConsoleService, Path]:
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    (tree / "a.log").write_text("INFO start\nERROR disk full\n")
+    (tree / "b.log").write_text("INFO nothing here\n")
+    (tree / "sub" / "c.log").write_text("error lowercase\n")
+
+    service = LinuxConsoleService()
+    service.index = TrigramIndex(tmp_path / ".index")
+    return service, tree
+
+
+def test_success_incremental(indexed):
+    service, tree = indexed
+    stats = service.build_index(tree)
+    assert (stats.updated, stats.unchanged, stats.removed) == (3, 0, 0)
+
+    (tree / "b.log").write_text("INFO changed\n")
+    (tree / "sub" / "c.log").unlink()
+    stats = service.build_index(tree)
+    assert (stats.updated, stats.unchanged, stats.removed) == (1, 1, 1)
+
+
+def test_success_grep_skips_non_candidates(indexed):
+    service, tree = indexed
+    service.build_index(tree)
+
+    # Подменяем содержимое, сохранив размер и mtime: индекс считает файл неизменным и не дает его читать
+    b_stat = (tree / "b.log").stat()
+    (tree / "b.log").write_text("ERROR nothing her\n")
+    os.utime(tree / "b.log", ns=(b_stat.st_atime_ns, b_stat.st_mtime_ns))
+
+    assert service.grep("ERROR", tree, r=True, i=False) == ["a.log:2:ERROR disk full\n"]
+
+
+def test_success_grep_reads_changed_files(indexed):
+    service, tree = indexed
+    service.build_index(tree)
+    (tree / "b.log").write_text("ERROR appeared later\n")
+    (tree / "new.log").write_text("ERROR new file\n")
+
+    res = service.grep("ERROR", tree, r=True, i=False)
+    assert sorted(res) == ["a.log:2:ERROR disk full\n", "b.log:1:ERROR appeared later\n", "new.log:1:ERROR new file\n"]
+
+
+def test_success_grep_ignore_case(indexed):
+    service, tree = indexed
+    service.build_index(tree)
+    res = service.grep("ERROR", tree, r=True, i=True, fixed=True)
+    assert sorted(res) == ["a.log:2:ERROR disk full\n", os.path.join("sub", "c.log") + ":1:error lowercase\n"]
+
+
+def test_success_grep_long_needle(indexed, monkeypatch):
+    service, tree = indexed
+    service.build_index(tree)
+    # Лимит параметров как у SQLite до 3.32: триграмм в строке больше, и запрос берет только самые редкие из них
+    connect = TrigramIndex._connect
+
+    def limited_connect(self):
+        connection = connect(self)
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        return connection
+
+    monkeypatch.setattr(TrigramIndex, "_connect", limited_connect)
+    needle = "".join(random.Random(0).choices(string.ascii_lowercase + string.digits, k=3000))
+    (tree / "b.log").write_text(needle + "\n")
+    assert service.grep(needle, tree, r=True, i=False, fixed=True) == ["b.log:1:" + needle + "\n"]
+
+
+def test_success_most_selective(indexed):
+    service, tree = indexed
+    service.build_index(tree)
+    with service.index._connect() as connection:
+        grams = [int.from_bytes(gram, "big") for gram in (b"err", b"dis", b"zzz")]
+        assert trigram_index.TrigramIndex.most_selective(connection, grams, limit=2) == [grams[2], grams[1]]
+    connection.close()
+
+
+def test_e_not_dir(indexed):
+    service, tree = indexed
+    with pytest.raises(NotADirectoryError):
+        service.build_index(tree / "a.log")
@@ -1,7 +1,14 @@
+import os
+import stat
+import time
+from datetime import datetime
 from pathlib import Path
 
 import pytest
 
+from services.linux_console import LinuxConsoleService
+from src.enums.constants import LS_CACHE_RACY_NS
+
 
 def test_success_without_hidden(linux_console):
     res = " ".join(linux_console.ls(Path("/home/test/"), hidden=False, detailed=False))
@@ -30,3 +37,110 @@ def test_e_notfound(linux_console):
 def test_e_dir(linux_console):
     with pytest.raises(NotADirectoryError):
         linux_console.ls(Path("/home/test/testD.txt"), hidden=True, detailed=False)
+
+
+def test_success_detailed_format(linux_console, fs):
+    fs.create_file("/home/listing/b.txt", contents="12345")
+    fs.create_file("/home/listing/a.txt")
+    item_stat = os.stat("/home/listing/b.txt")
+    time = datetime.fromtimestamp(item_stat.st_mtime).strftime("%b %d %H:%M")
+
+    res = linux_console.ls(Path("/home/listing"), hidden=False, detailed=True)
+    assert [line.split()[-1] for line in res] == ["a.txt", "b.txt"]
+    assert res[1] == f"{stat.filemode(item_stat.st_mode)}        5 {time} b.txt \n"
+
+
+def test_success_detailed_broken_symlink(linux_console, fs):
+    fs.create_symlink("/home/test/broken", "/home/test/nowhere")
+    res = " ".join(linux_console.ls(Path("/home/test/"), hidden=False, detailed=True))
+    assert "broken" in res
+
+
+def make_old(path):
+    os.utime(path, ns=(0, time.time_ns() - 10 * LS_CACHE_RACY_NS))
+
+
+def test_cache_hit(linux_console, fs):
+    fs.create_file("/home/cached/a.txt")
+    make_old("/home/cached")
+    linux_console.ls(Path("/home/cached"), hidden=False, detailed=False)
+
+    listing = linux_console.listings.entries[linux_console.listings.key("/home/cached", False)]
+    listing.lines = ["from cache\n"]
+    assert linux_console.ls(Path("/home/cached"), hidden=False, detailed=False) == ["from cache\n"]
+
+
+def test_cache_racy_directory_not_cached(linux_console, fs):
+    fs.create_file("/home/cached/a.txt")
+    linux_console.ls(Path("/home/cached"), hidden=False, detailed=False)
+    assert not linux_console.listings.entries
+
+
+def test_cache_mtime_invalidation(tmp_path):
+    # pyfakefs не меняет mtime каталога при создании файлов в нем, поэтому проверяем на настоящей файловой системе
+    service = LinuxConsoleService()
+    (tmp_path / "a.txt").touch()
+    make_old(tmp_path)
+    service.ls(tmp_path, hidden=False, detailed=False)
+    assert service.listings.entries
+
+    (tmp_path / "b.txt").touch()
+    assert "b.txt" in " ".join(service.ls(tmp_path, hidden=False, detailed=False))
+
+
+def test_cache_detailed_sees_new_size(linux_console, fs):
+    fs.create_file("/home/cached/a.txt")
+    make_old("/home/cached")
+    linux_console.ls(Path("/home/cached"), hidden=False, detailed=True)
+
+    with open("/home/cached/a.txt", "w") as f:
+        f.write("12345")
+    assert "       5 " in linux_console.ls(Path("/home/cached"), hidden=False, detailed=True)[0]
+
+
+def test_cache_invalidated_by_rm(linux_console, fs):
+    fs.create_file("/home/cached/a.txt")
+    fs.create_file("/home/cached/b.txt")
+    make_old("/home/cached")
+    directory_stat = os.stat("/home/cached")
+    linux_console.ls(Path("/home/cached"), hidden=False, detailed=False)
+
+    linux_console.rm("/home/cached/b.txt", recursive=False)
+    # Возвращаем каталогу прежний mtime: по подписи запись все еще верна, убрать ее мог только сам rm
+    os.utime("/home/cached", ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+    assert "b.txt" not in " ".join(linux_console.ls(Path("/home/cached"), hidden=False, detailed=False))
+
+
+def test_stream_unsorted(linux_console, fs):
+    for name in ("c", "a", "b", ".hidden"):
+        fs.create_file(f"/home/big/{name}")
+    res = list(linux_console.ls_stream(Path("/home/big"), hidden=False, detailed=False, unsorted=True))
+    assert sorted(res) == ["a\n", "b\n", "c\n"]
+
+    res = list(linux_console.ls_stream(Path("/home/big"), hidden=True, detailed=True, unsorted=True, limit=2, offset=1))
+    assert len(res) == 2 and all(line.startswith("-rw") for line in res)
+
+
+def test_stream_page(linux_console, fs):
+    for n in reversed(range(50)):
+        fs.create_file(f"/home/big/file{n:02d}")
+    res = linux_console.ls_stream(Path("/home/big"), hidden=False, detailed=True, limit=3, offset=10)
+    assert [line.split()[-1] for line in res] == ["file10", "file11", "file12"]
+
+    res = " ".join(linux_console.ls_stream(Path("/home/big"), hidden=False, detailed=False, offset=48))
+    assert res.split() == ["file48", "file49"]
+
+
+def test_stream_page_from_cache(linux_console, fs):
+    fs.create_file("/home/big/a")
+    fs.create_file("/home/big/b")
+    make_old("/home/big")
+    linux_console.ls(Path("/home/big"), hidden=False, detailed=False)
+    linux_console.listings.entries[linux_console.listings.key("/home/big", False)].names = ["cached"]
+
+    assert "".join(linux_console.ls_stream(Path("/home/big"), hidden=False, detailed=False, limit=1)).split() == ["cached"]
+
+
+def test_e_stream_page(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.ls_stream(Path("/home/test/"), hidden=False, detailed=False, limit=-1)
@@ -1,7 +1,12 @@
+import os
+import stat
 from pathlib import Path
 
 import pytest
 
+from src.utils import copy as copy_module
+from src.utils.progress import Progress
+
 
 def test_success_file(linux_console):
     linux_console.mv("/home/test/testD.txt", "/home/test/moved.txt")
@@ -45,3 +50,48 @@ def test_e_permission(linux_console, fake_system):
     fake_system.chmod("/protected", 0o055)
     with pytest.raises(PermissionError):
         linux_console.mv("/home/test/testD.txt", "/protected/move.txt")
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_success_cross_device_dir(linux_console, fake_system, jobs):
+    fake_system.add_mount_point("/mnt/other")
+    fake_system.create_file("/home/test/data1/sub/test3.txt", contents="TEST 3")
+    fake_system.create_symlink("/home/test/data1/link.txt", "test1.txt")
+    progress = Progress("mv")
+
+    linux_console.mv("/home/test/data1", "/mnt/other", progress, jobs)
+
+    assert not Path("/home/test/data1").exists()
+    assert Path("/mnt/other/data1/sub/test3.txt").read_text() == "TEST 3"
+    assert os.readlink("/mnt/other/data1/link.txt") == "test1.txt"
+    assert progress.files == 5
+
+
+def test_success_cross_device_file(linux_console, fake_system):
+    fake_system.add_mount_point("/mnt/other")
+    linux_console.mv("/home/test/testD.txt", "/mnt/other/moved.txt")
+    assert not Path("/home/test/testD.txt").exists()
+    assert Path("/mnt/other/moved.txt").read_text() == "TEST D"
+
+
+def test_e_cross_device_failure_keeps_source(linux_console, fake_system, monkeypatch):
+    fake_system.add_mount_point("/mnt/other")
+
+    def failing_copy(src, dst, *args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(copy_module, "copy_file", failing_copy)
+    with pytest.raises(OSError, match="disk full"):
+        linux_console.mv("/home/test/data1", "/mnt/other", jobs=2)
+    assert Path("/home/test/data1/test1.txt").read_text() == "TEST 1"
+
+
+def test_success_cross_device_fifo(tmp_path):
+    os.mkfifo(tmp_path / "pipe", 0o640)
+    progress = Progress("mv")
+
+    assert copy_module.move_file(str(tmp_path / "pipe"), str(tmp_path / "moved"), progress=progress) == "special"
+    assert not (tmp_path / "pipe").exists()
+    assert stat.S_ISFIFO(os.lstat(tmp_path / "moved").st_mode)
+    assert stat.S_IMODE(os.lstat(tmp_path / "moved").st_mode) == 0o640
+    assert progress.files == 1
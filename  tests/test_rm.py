@@ -1,7 +1,11 @@
+import os
 from pathlib import Path
 
 import pytest
 
+from src.utils.progress import Progress
+from src.utils.remove import remove_tree
+
 
 def test_success_file(linux_console):
     linux_console.rm("/home/test/testD.txt", False)
@@ -55,3 +59,46 @@ def test_rm_unknown_file_type_simple(linux_console, monkeypatch):
     monkeypatch.setattr('src.services.linux_console.Path.is_dir', lambda self: False)
     with pytest.raises(TypeError):
         linux_console.rm("/home/test/testD.txt", False)
+
+
+def test_success_progress(linux_console, fake_system):
+    fake_system.create_file("/home/test/data1/sub/test3.txt", contents="TEST 3")
+    progress = Progress("rm")
+    linux_console.rm("/home/test/data1", True, progress)
+
+    assert not Path("/home/test/data1").exists()
+    assert (progress.files, progress.bytes) == (4, 18)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_success_deep_tree(linux_console, fake_system, jobs):
+    for a in range(3):
+        for b in range(3):
+            fake_system.create_file(f"/home/test/tree/a{a}/b{b}/file.txt", contents="x")
+    fake_system.create_symlink("/home/test/tree/link", "/home/test/data1")
+
+    linux_console.rm("/home/test/tree", True, jobs=jobs)
+
+    assert not Path("/home/test/tree").exists()
+    assert Path("/home/test/data1/test1.txt").exists()
+
+
+def test_success_real_fs(tmp_path):
+    for n in range(20):
+        (tmp_path / "tree" / f"dir{n % 4}").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "tree" / f"dir{n % 4}" / f"file{n}").write_text("x")
+
+    remove_tree(tmp_path / "tree", jobs=3)
+    assert not (tmp_path / "tree").exists()
+
+
+def test_e_jobs(linux_console):
+    with pytest.raises(ValueError):
+        linux_console.rm("/home/test/data1", True, jobs=0)
+
+
+def test_success_symlink_to_dir_keeps_target(fake_system):
+    fake_system.create_symlink("/home/dirlink", "/home/test/data1")
+    remove_tree("/home/dirlink")
+    assert not os.path.lexists("/home/dirlink")
+    assert os.path.exists("/home/test/data1/test1.txt")
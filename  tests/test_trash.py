@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+
+
+def test_success_manifest_entries(history_service):
+    first = history_service.backup(Path("/home/test/testD.txt"))
+    second = history_service.backup(Path("/home/test/data1"))
+
+    entries = history_service.trash.entries()
+    assert [entry.id for entry in entries] == [first.name, second.name]
+    assert entries[0].source == "/home/test/testD.txt"
+    # rm только переименовывает: размер считается потом, в measure, и сохраняется в манифесте
+    assert [entry.size for entry in entries] == [None, None]
+
+    assert [size for _, size in history_service.trash.measure(entries)] == [6, 12]
+    entries = history_service.trash.entries()
+    assert (entries[0].type, entries[0].size) == ("file", 6)
+    assert (entries[1].type, entries[1].size) == ("dir", 12)
+
+
+def test_success_same_names_do_not_collide(history_service, fake_system):
+    first = history_service.backup(Path("/home/test/testD.txt"))
+    fake_system.create_file("/home/test/testD.txt", contents="NEW")
+    second = history_service.backup(Path("/home/test/testD.txt"))
+    assert first != second
+    assert (first.read_text(), second.read_text()) == ("TEST D", "NEW")
+
+
+def test_success_restore(history_service):
+    backup = history_service.backup(Path("/home/test/data1"))
+    history_service.restore(backup)
+    assert Path("/home/test/data1/test1.txt").read_text() == "TEST 1"
+    assert history_service.trash.entries() == []
+
+
+def test_success_purge(history_service):
+    history_service.backup(Path("/home/test/testD.txt"))
+    backup = history_service.backup(Path("/home/test/data1"))
+    assert history_service.trash.purge() == 2
+    assert not backup.exists()
+    assert history_service.trash.entries() == []
+
+
+def test_e_restore_unknown(history_service):
+    with pytest.raises(FileNotFoundError):
+        history_service.restore("/nowhere/deadbeef")
+
+
+def test_success_gc_by_entries(history_service, fake_system):
+    history_service.trash_max_entries = 2
+    for n in range(4):
+        fake_system.create_file(f"/home/test/file{n}.txt", contents="x" * n)
+        history_service.backup(Path(f"/home/test/file{n}.txt"))
+
+    assert history_service.collect_trash() == 2
+    assert [entry.source for entry in history_service.trash.entries()] == ["/home/test/file2.txt", "/home/test/file3.txt"]
+
+
+def test_success_gc_keeps_newest(history_service):
+    history_service.trash_max_bytes = 0
+    history_service.backup(Path("/home/test/testD.txt"))
+    newest = history_service.backup(Path("/home/test/data1"))
+
+    assert history_service.collect_trash() == 1
+    assert [entry.id for entry in history_service.trash.entries()] == [newest.name]
+
+
+def test_success_gc_by_age(history_service, monkeypatch):
+    history_service.trash_max_age = 60
+    monkeypatch.setattr("utils.trash.time.time", lambda: 1000.0)
+    history_service.backup(Path("/home/test/testD.txt"))
+    monkeypatch.setattr("utils.trash.time.time", lambda: 2000.0)
+    history_service.backup(Path("/home/test/data1"))
+    history_service.backup(Path("/home/test/data2"))
+
+    assert history_service.collect_trash() == 1
+    assert len(history_service.trash.entries()) == 2
+
+
+def test_success_gc_background(history_service):
+    history_service.trash_max_entries = 1
+    history_service.backup(Path("/home/test/testD.txt"))
+    history_service.backup(Path("/home/test/data1"))
+    history_service.collect_trash_background()
+    history_service.trash_gc.join()
+    assert len(history_service.trash.entries()) == 1
+
+
+def test_success_gc_keeps_undo_backups(history_service, fake_system):
+    history_service.trash_max_entries = 1
+    backups = []
+    for n in range(3):
+        fake_system.create_file(f"/home/test/file{n}.txt")
+        backups.append(history_service.backup(Path(f"/home/test/file{n}.txt")))
+    history_service.add_undo("rm", "/home/test/file0.txt", backup=str(backups[0]))
+
+    assert history_service.collect_trash() == 1
+    assert [entry.id for entry in history_service.trash.entries()] == [backups[0].name, backups[2].name]
+
+    history_service.restore(history_service.get_undo()["backup_path"])
+    assert Path("/home/test/file0.txt").exists()
+
+
+def test_success_gc_evicts_backups_beyond_undo_depth(history_service, fake_system):
+    # Как настоящий rm: каждый бэкап попадает и в корзину, и в журнал undo
+    service = type(history_service)(trash_max_entries=2, undo_depth=2)
+    backups = []
+    for n in range(6):
+        fake_system.create_file(f"/home/test/file{n}.txt")
+        backups.append(service.backup(Path(f"/home/test/file{n}.txt")))
+        service.add_undo("rm", f"/home/test/file{n}.txt", backup=str(backups[-1]))
+
+    assert service.collect_trash() == 4
+    assert [entry.id for entry in service.trash.entries()] == [backups[4].name, backups[5].name]
+
+    service.restore(service.get_undo()["backup_path"])
+    assert Path("/home/test/file5.txt").exists()
+
+
+def test_e_restore_purged(history_service):
+    backup = history_service.backup(Path("/home/test/testD.txt"))
+    history_service.collect_trash_background()
+    assert history_service.purge_trash() == 1
+    with pytest.raises(FileNotFoundError, match="trash --purge"):
+        history_service.restore(backup)
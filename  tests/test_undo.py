@@ -0,0 +1,63 @@
+from services.history_service import HistoryService
+
+
+def test_success_multilevel(history_service):
+    history_service.add_undo("cp", "/home/test/a", "/home/test/b")
+    history_service.add_undo("mv", "/home/test/c", "/home/test/d")
+
+    assert history_service.get_undo()["type"] == "mv"
+    assert history_service.get_undo()["type"] == "cp"
+    assert history_service.get_undo() is None
+
+
+def test_success_survives_restart(history_service):
+    history_service.add_undo("rm", "/home/test/файл.txt", backup="/trash/1", r=False)
+    history_service.close()
+
+    record = HistoryService().get_undo()
+    assert record == {
+        "type": "rm",
+        "source": "/home/test/файл.txt",
+        "destination": None,
+        "backup_path": "/trash/1",
+        "recursive": False,
+    }
+
+
+def test_success_torn_tail(history_service):
+    history_service.add_undo("cp", "/home/test/a", "/home/test/b")
+    history_service.add_undo("mv", "/home/test/c", "/home/test/d")
+    with open(history_service.undo.path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00{\"type\": \"r")
+
+    assert history_service.get_undo()["type"] == "mv"
+    assert history_service.get_undo()["type"] == "cp"
+    assert history_service.get_undo() is None
+
+
+def test_success_garbage_journal(history_service):
+    history_service.undo.path.write_bytes(b"garbage")
+    assert history_service.get_undo() is None
+    assert history_service.undo.path.stat().st_size == 0
+
+
+def test_success_compacts_to_depth(history_service):
+    service = type(history_service)(undo_depth=3)
+    for n in range(7):
+        service.add_undo("cp", f"/home/test/{n}", f"/home/test/copy{n}")
+
+    assert [record["source"] for record in service.undo.records()] == ["/home/test/4", "/home/test/5", "/home/test/6"]
+    assert service.undo.count == 3
+    assert [service.get_undo()["source"] for _ in range(3)] == ["/home/test/6", "/home/test/5", "/home/test/4"]
+    assert service.get_undo() is None
+
+
+def test_success_no_compaction_over_torn_record(history_service):
+    service = type(history_service)(undo_depth=1)
+    service.add_undo("cp", "/home/test/a", "/home/test/b")
+    with open(service.undo.path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00{\"type\": \"r")
+    service.add_undo("mv", "/home/test/c", "/home/test/d")
+    service.add_undo("mv", "/home/test/e", "/home/test/f")
+
+    assert service.get_undo()["source"] == "/home/test/e"
@@ -0,0 +1,74 @@
+"""
+Бенчмарк cp -r: copy_tree на пуле потоков с разным -j против shutil.copytree.
+Два дерева во временном каталоге: много мелких файлов и несколько больших.
+
+Запуск из корня проекта:
+    python benchmarks/bench_cp.py --small 20000 --large 4 --large-size 256
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.copy import copy_tree
+
+
+def make_small(root: Path, files: int) -> None:
+    """files файлов по 1 КиБ, по 500 штук в каталоге."""
+    data = os.urandom(1024)
+    for n in range(files):
+        directory = root / f"dir{n // 500}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file{n}.bin").write_bytes(data)
+
+
+def make_large(root: Path, files: int, size_mib: int) -> None:
+    root.mkdir(exist_ok=True)
+    block = os.urandom(2**20)
+    for n in range(files):
+        with open(root / f"large{n}.bin", "wb") as f:
+            f.writelines(block for _ in range(size_mib))
+
+
+def measure(action, dst: Path) -> float:
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(dst)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--small", type=int, default=10_000, help="Количество мелких файлов")
+    parser.add_argument("--large", type=int, default=4, help="Количество больших файлов")
+    parser.add_argument("--large-size", type=int, default=128, help="Размер большого файла, МиБ")
+    parser.add_argument("--jobs", type=int, nargs="*", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = {
+            f"{args.small} small files": Path(tmp) / "small",
+            f"{args.large} x {args.large_size} MiB": Path(tmp) / "large",
+        }
+        make_small(trees[f"{args.small} small files"], args.small)
+        make_large(trees[f"{args.large} x {args.large_size} MiB"], args.large, args.large_size)
+        dst = Path(tmp) / "copy"
+
+        for name, src in trees.items():
+            print(name)
+            baseline = measure(lambda src=src: shutil.copytree(src, dst), dst)
+            print(f"  copytree {baseline:8.3f}s")
+            for jobs in args.jobs:
+                elapsed = measure(lambda src=src, jobs=jobs: copy_tree(src, dst, jobs), dst)
+                print(f"  -j {jobs:<5} {elapsed:8.3f}s  x{baseline / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
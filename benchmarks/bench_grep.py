@@ -0,0 +1,76 @@
+"""
+Бенчмарк параллельного grep -r: как время поиска масштабируется с количеством процессов (-j).
+Генерирует синтетическое дерево во временном каталоге и прогоняет по нему grep с разным jobs.
+
+Запуск из корня проекта:
+    python benchmarks/bench_grep.py --dirs 50 --files 200 --lines 500
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.linux_console import LinuxConsoleService
+
+
+def make_tree(root: Path, dirs: int, files: int, lines: int) -> int:
+    """Создаем dirs каталогов по files файлов, в каждом lines строк случайного текста. Примерно каждая сотая строка с ERROR."""
+    rnd = random.Random(42)
+    total = 0
+    for d in range(dirs):
+        directory = root / f"dir{d}"
+        directory.mkdir()
+        for f in range(files):
+            rows = []
+            for _ in range(lines):
+                word = "".join(rnd.choices(string.ascii_lowercase, k=60))
+                rows.append(f"ERROR {word}\n" if rnd.random() < 0.01 else f"INFO {word}\n")
+            data = "".join(rows)
+            (directory / f"file{f}.log").write_text(data)
+            total += len(data)
+    return total
+
+
+def job_counts() -> list[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dirs", type=int, default=20)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--pattern", default=r"ERROR\s+[a-f]+z")
+    parser.add_argument("--jobs", type=int, nargs="*", help="Список -j для прогона. По умолчанию 1, 2, 4... до числа ядер")
+    args = parser.parse_args()
+
+    service = LinuxConsoleService()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        size = make_tree(root, args.dirs, args.files, args.lines)
+        print(f"tree: {args.dirs * args.files} files, {size / 2**20:.1f} MiB")
+
+        baseline = None
+        for jobs in args.jobs or job_counts():
+            start = time.perf_counter()
+            matches = sum(1 for _ in service.grep_iter(args.pattern, root, r=True, i=False, jobs=jobs))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"-j {jobs:<3} {elapsed:8.3f}s  x{baseline / elapsed:5.2f}  ({matches} matches)")
+
+
+if __name__ == "__main__":
+    main()
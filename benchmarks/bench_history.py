@@ -0,0 +1,66 @@
+"""
+Бенчмарк history N: чтение хвоста .history с конца против полного чтения файла.
+Генерирует историю на несколько миллионов строк во временном каталоге.
+
+Запуск из корня проекта:
+    python benchmarks/bench_history.py --lines 5000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.history_service import HistoryService
+
+
+def make_history(path: Path, lines: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(
+            "".join(f"{n} grep -r ERROR /var/log/app{n % 17}\n" for n in range(start, min(start + 100_000, lines + 1)))
+            for start in range(1, lines + 1, 100_000)
+        )
+
+
+def measure(action) -> tuple[float, int]:
+    """Время и пик памяти Python-аллокаций за один вызов."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--tail", type=int, nargs="*", default=[10, 1000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # .history, .trash и журнал undo - во временном каталоге, настоящие файлы проекта бенчмарк не трогает
+        service = HistoryService(root=Path(tmp))
+        make_history(service.history_file, args.lines)
+        print(f"history: {args.lines} lines, {service.history_file.stat().st_size / 2**20:.1f} MiB")
+
+        def full_read(length: int) -> None:
+            with open(service.history_file, "r", encoding="utf-8") as f:
+                f.readlines()[::-1][:length]
+
+        for length in args.tail:
+            tail_time, tail_peak = measure(lambda length=length: service.get(length))
+            full_time, full_peak = measure(lambda length=length: full_read(length))
+            print(
+                f"history {length:<7} tail: {tail_time * 1000:9.2f} ms {tail_peak / 2**20:8.2f} MiB   "
+                f"full read: {full_time * 1000:9.2f} ms {full_peak / 2**20:8.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
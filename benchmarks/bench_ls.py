@@ -0,0 +1,85 @@
+"""
+Бенчмарк ls -l на огромном каталоге: один проход os.scandir с кэшами форматирования
+против прежней схемы (iterdir, потом os.stat и strftime на каждое имя).
+Затем время до первой строки: обычный ls против потокового ls -U и страницы --limit.
+Каталог с файлами создается во временной папке один раз.
+
+Запуск из корня проекта:
+    python benchmarks/bench_ls.py --files 100000
+"""
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.linux_console import LinuxConsoleService
+from src.utils.ls import format_minute, format_mode
+
+
+def old_detailed_ls(path: Path) -> list[str]:
+    """Прежняя реализация ls -l: имена через iterdir, затем stat по полному пути и strftime на каждый файл."""
+    items = sorted(item.name for item in path.iterdir() if not item.name.startswith("."))
+    strings = []
+    for filename in items:
+        item_stat = os.stat(os.path.join(path, filename))
+        permissions = stat.filemode(item_stat.st_mode)
+        mtime = datetime.fromtimestamp(item_stat.st_mtime).strftime("%b %d %H:%M")
+        strings.append(f"{permissions} {item_stat.st_size:>8} {mtime} {filename} \n")
+    return strings
+
+
+def measure(action, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dir", help="Где создавать каталог (например, на сетевой файловой системе)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp)
+        for n in range(args.files):
+            (root / f"file{n:07d}.txt").touch()
+        service = LinuxConsoleService()
+        print(f"directory: {args.files} files")
+
+        baseline = measure(lambda: old_detailed_ls(root), args.repeat)
+        print(f"iterdir + stat  {baseline:8.3f}s")
+
+        def new() -> None:
+            format_mode.cache_clear()
+            format_minute.cache_clear()
+            service.ls(root, hidden=False, detailed=True)
+
+        elapsed = measure(new, args.repeat)
+        print(f"scandir         {elapsed:8.3f}s  x{baseline / elapsed:5.2f}")
+
+        print("time to first line:")
+        variants = {
+            "ls": lambda: iter(service.ls(root, hidden=False, detailed=False)),
+            "ls -U": lambda: service.ls_stream(root, hidden=False, detailed=False, unsorted=True),
+            "ls --limit 100": lambda: service.ls_stream(root, hidden=False, detailed=False, limit=100),
+        }
+        for name, listing in variants.items():
+            # Кэш листингов сбрасываем перед каждым прогоном: меряем чтение каталога, а не попадание в кэш
+            first = measure(lambda listing=listing: service.listings.clear() or next(listing()), args.repeat)
+            print(f"{name:<15} {first * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Бенчмарк rm -r: remove_tree (unlink относительно дескриптора каталога, поддеревья на пуле потоков) против shutil.rmtree.
+Перед каждым прогоном заново создает дерево мелких файлов во временном каталоге.
+
+Запуск из корня проекта:
+    python benchmarks/bench_rm.py --dirs 200 --files 500
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.remove import remove_tree
+
+
+def make_tree(root: Path, dirs: int, files: int) -> None:
+    """dirs каталогов по два уровня вложенности, в каждом files пустых файлов."""
+    for d in range(dirs):
+        directory = root / f"group{d % 10}" / f"dir{d}"
+        directory.mkdir(parents=True)
+        for f in range(files):
+            (directory / f"file{f}").touch()
+
+
+def measure(action, root: Path, dirs: int, files: int) -> float:
+    make_tree(root, dirs, files)
+    start = time.perf_counter()
+    action(root)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dirs", type=int, default=100)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--jobs", type=int, nargs="*", default=[1, 4, 8, 16])
+    parser.add_argument("--dir", help="Где создавать дерево (например, на сетевой или overlay файловой системе)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp) / "tree"
+        print(f"tree: {args.dirs} dirs, {args.dirs * args.files} files")
+
+        baseline = measure(shutil.rmtree, root, args.dirs, args.files)
+        print(f"rmtree   {baseline:8.3f}s")
+        for jobs in args.jobs:
+            elapsed = measure(lambda path, jobs=jobs: remove_tree(path, jobs=jobs), root, args.dirs, args.files)
+            print(f"-j {jobs:<5} {elapsed:8.3f}s  x{baseline / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
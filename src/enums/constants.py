@@ -7,3 +7,72 @@ BINARY = {
     '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
     '.db', '.sqlite', '.tmp', '.o', '.obj'
 }
+
+# Параллельный grep: сколько файлов отдаем воркеру за раз и сколько пачек на воркера держим в очереди
+GREP_BATCH_SIZE = 64
+GREP_TASKS_PER_WORKER = 4
+
+# Первый блок файла, в котором grep ищет NUL-байт, чтобы понять, двоичный ли файл
+GREP_SNIFF_SIZE = 8 * 1024
+# Текстовые файлы от этого размера grep читает через mmap кусками по GREP_CHUNK_SIZE
+GREP_MMAP_THRESHOLD = 1024 * 1024
+GREP_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Спецсимволы регулярок: паттерн без них grep ищет как обычную строку
+REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+
+# Триграммный индекс: какими кусками читаем файл при индексации и по скольким самым редким триграммам строки ищем кандидатов
+INDEX_CHUNK_SIZE = 1024 * 1024
+INDEX_QUERY_TRIGRAMS = 32
+
+# Каким блоком .history читается с конца (номер последней команды, history N)
+HISTORY_BLOCK_SIZE = 64 * 1024
+
+# Ротация .history: лимиты текущего сегмента, сколько старых сегментов хранить (None - все) и сжимать ли их gzip
+HISTORY_MAX_ENTRIES = 10_000
+HISTORY_MAX_BYTES = 1024 * 1024
+HISTORY_KEEP_SEGMENTS = None
+HISTORY_COMPRESS_SEGMENTS = True
+
+# Манифест корзины .trash: что, откуда и когда туда попало
+TRASH_MANIFEST = "manifest.jsonl"
+
+# Лимиты корзины для сборщика мусора, сколько объектов он удаляет за один проход и сколькими потоками
+TRASH_MAX_BYTES = 5 * 1024 ** 3
+TRASH_MAX_AGE = 30 * 24 * 60 * 60
+TRASH_MAX_ENTRIES = 1000
+TRASH_GC_BATCH = 100
+TRASH_GC_JOBS = 4
+
+# Журнал undo .undo: fsync делается раз в UNDO_FSYNC_BATCH записей (и при выходе из консоли)
+UNDO_JOURNAL = ".undo"
+UNDO_FSYNC_BATCH = 8
+
+# Глубина undo: бэкапы последних UNDO_DEPTH команд сборщик мусора корзины не трогает, более старые может выкинуть
+UNDO_DEPTH = 100
+
+# Параллельный cp -r: сколько файлов на один поток держим в очереди пула
+COPY_TASKS_PER_WORKER = 16
+
+# Размер куска для копирования файла (copy_file_range и буферный цикл)
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Как часто (в секундах) перерисовывать строку прогресса у долгих cp/mv/rm/zip/tar
+PROGRESS_INTERVAL = 0.2
+
+# Журнал cp -r для --resume: сколько готовых файлов копим в памяти перед дозаписью в журнал
+COPY_CHECKPOINT_BATCH = 256
+
+# cp --update: файлы от SYNC_DELTA_THRESHOLD байт обновляются поблочно, блоками по SYNC_BLOCK_SIZE
+SYNC_BLOCK_SIZE = 1024 * 1024
+SYNC_DELTA_THRESHOLD = 8 * 1024 * 1024
+
+# Потоковый cat: каким куском выводим файл и читаем его при поиске строк для --head/--tail
+CAT_CHUNK_SIZE = 1024 * 1024
+
+# cat --follow без inotify: как часто (в секундах) проверять, не дописали ли файл
+FOLLOW_POLL_INTERVAL = 0.25
+
+# Кэш листингов ls: сколько каталогов помнить и каталоги моложе LS_CACHE_RACY_NS наносекунд не кэшировать
+LS_CACHE_SIZE = 64
+LS_CACHE_RACY_NS = 1_000_000_000
@@ -1,12 +1,16 @@
 import sys
+from datetime import datetime
 from pathlib import Path
+from typing import Annotated
 from loguru import logger
 from typer import Typer, Context
 
 from services.history_service import HistoryService
 from src.dependencies.container import Container, get_container
+from src.enums.constants import COPY_CHUNK_SIZE
 from src.enums.file_mode import FileReadMode
 from src.services.linux_console import LinuxConsoleService
+from src.utils.progress import Progress, format_size
 import click
 import typer
 from click_shell import make_click_shell
@@ -25,6 +29,11 @@ def my_app(ctx):
     pass
 
 
+def make_progress(operation: str) -> Progress:
+    """Прогресс долгой операции. Строку прогресса рисуем в stderr, только если это терминал, итог в любом случае идет в лог."""
+    return Progress(operation, sys.stderr.write if sys.stderr.isatty() else None)
+
+
 @app.callback()
 def main(ctx: Context) -> None:
     """Точка входа в приложение:Создание кастомного логгера. Занесение в контекст контейнера с сервисами."""
@@ -35,6 +44,7 @@ def main(ctx: Context) -> None:
         console_service=LinuxConsoleService(),
         history_service=HistoryService(),
     )
+    ctx.call_on_close(ctx.obj.history_service.close)
 
 
 @app.command()
@@ -43,16 +53,22 @@ def ls(
         path: Path = typer.Argument(
             None, exists=False, readable=False),
         hidden: bool = typer.Option(False, "-a", help="Флаг для отображения скрытых файлов"),
-        detailed: bool = typer.Option(False, "-l", help="Флаг для более подробного и структурированного вывода команды")
+        detailed: bool = typer.Option(False, "-l", help="Флаг для более подробного и структурированного вывода команды"),
+        unsorted: bool = typer.Option(False, "-U", help="Не сортировать: выводить файлы по мере чтения каталога"),
+        limit: int = typer.Option(None, "--limit", help="Вывести не больше N файлов"),
+        offset: int = typer.Option(0, "--offset", help="Пропустить первые N файлов"),
 ) -> None:
     """Команда ls. Выводит список файлов в текущей директории"""
     try:
         container = get_container(ctx)
-        result = container.console_service.ls(path, hidden, detailed)
+        if unsorted or limit is not None or offset:
+            result = container.console_service.ls_stream(path, hidden, detailed, unsorted, limit, offset)
+        else:
+            result = container.console_service.ls(path, hidden, detailed)
         sys.stdout.writelines(result)
 
         logger.success("SUCCESS")
-    except OSError as e:
+    except (OSError, ValueError) as e:
         logger.error(f"ERROR: {str(e)}")
         typer.echo(str(e), err=True)
 
@@ -81,19 +97,27 @@ def cat(
         file: Path = typer.Argument(
             ..., exists=False, readable=False, help="Вывести содержимое файла"
         ),
-        mode: bool = typer.Option(False, "-b", "--bytes", help="Прочитать файл как слайс байтов")
+        mode: bool = typer.Option(False, "-b", "--bytes", help="Прочитать файл как слайс байтов"),
+        offset: int = typer.Option(0, "--offset", help="С какого байта начать вывод"),
+        length: int = typer.Option(None, "--length", help="Сколько байт вывести"),
+        head: int = typer.Option(None, "--head", help="Вывести только первые N строк"),
+        tail: int = typer.Option(None, "--tail", help="Вывести только последние N строк"),
+        follow: bool = typer.Option(False, "-f", "--follow", help="Выводить дописываемое в файл, пока не нажат Ctrl+C"),
 ) -> None:
     """Команда cat. Выводит содержимое указанного файла"""
     try:
         container: Container = get_container(ctx)
-        mode = FileReadMode.bytes if mode else FileReadMode.string
-        data = container.console_service.cat(file, mode)
-        if isinstance(data, str):
-            sys.stdout.write(data)
-        else:
-            sys.stdout.buffer.write(data)
+        read_mode = FileReadMode.bytes if mode else FileReadMode.string
+        sys.stdout.flush()
+        container.console_service.cat_stream(
+            file, sys.stdout.buffer, read_mode, offset=offset, length=length, head=head, tail=tail, follow=follow
+        )
+        sys.stdout.buffer.flush()
         logger.success("SUCCESS")
-    except OSError as e:
+    except KeyboardInterrupt:
+        sys.stdout.buffer.flush()
+        logger.success("SUCCESS")
+    except (OSError, ValueError) as e:
         logger.error(f"ERROR: {str(e)}")
         typer.echo(str(e), err=True)
 
@@ -104,8 +128,19 @@ def cp(
         source: Path = typer.Argument(None, help="Источник копирования"),
         destination: Path = typer.Argument(None, help="Путь назначения"),
         recursive: bool = typer.Option(False, "-r", "-R", help="Необходимый для рекурсивного копирования флаг"),
+        jobs: int = typer.Option(1, "-j", "--jobs", help="Количество потоков для копирования файлов при -r"),
+        chunk_size: int = typer.Option(COPY_CHUNK_SIZE, "--chunk-size", help="Размер куска копирования в байтах"),
+        resume: bool = typer.Option(False, "--resume", help="Продолжить прерванное копирование, пропуская готовые файлы"),
+        update: bool = typer.Option(False, "-u", "--update", help="Как в GNU cp: копировать, только если источник новее назначения"),
+        sync: bool = typer.Option(False, "--sync", help="Синхронизация: копировать только изменившееся, большие файлы - поблочно"),
+        checksum: bool = typer.Option(False, "--checksum", help="С --sync сверять содержимое поблочно, а не только размер и mtime"),
+        delete: bool = typer.Option(False, "--delete", help="С --sync удалить из назначения то, чего нет в источнике"),
 ) -> None:
-    """Команда cp. Копирует указанный файл/каталог и переносит копию по указанному пути"""
+    """
+    Команда cp. Копирует указанный файл/каталог и переносит копию по указанному пути.
+    С --update копирует только файлы новее назначения (как GNU cp -u), с --sync синхронизирует назначение с источником.
+    Такое копирование отменить через undo нельзя: удалить назначение целиком значило бы потерять то, что там было до него.
+    """
     if source is None:
         logger.error("ERROR: cp: пропущен операнд, задающий файл")
         typer.echo("cp: пропущен операнд, задающий файл")
@@ -117,7 +152,25 @@ def cp(
 
     try:
         container: Container = get_container(ctx)
-        container.console_service.cp(source, destination, recursive)
+        progress = make_progress("cp")
+        if (checksum or delete) and not sync:
+            raise ValueError("cp: --checksum и --delete работают только вместе с --sync")
+        if update or sync:
+            stats = container.console_service.sync(source, destination, recursive, checksum, delete, jobs, progress, newer=update)
+            logger.info(progress.finish())
+            report = (
+                f"cp: передано {format_size(stats.bytes_transferred)}, пропущено {format_size(stats.bytes_skipped)} "
+                f"(скопировано файлов {stats.copied}, без изменений {stats.unchanged}, удалено {stats.deleted})"
+            )
+            logger.info(report)
+            typer.echo(report)
+            logger.success("SUCCESS")
+            return
+
+        strategies = container.console_service.cp(source, destination, recursive, jobs, chunk_size, progress, resume)
+        logger.info(progress.finish())
+        if strategies:
+            logger.info("cp: " + ", ".join(f"{strategy}: {count}" for strategy, count in strategies.items()))
 
         true_dst = destination
         if destination.is_dir():
@@ -125,7 +178,7 @@ def cp(
 
         container.history_service.add_undo("cp", str(source), str(true_dst), r=recursive)
         logger.success("SUCCESS")
-    except OSError as e:
+    except (OSError, ValueError) as e:
         logger.error(f"ERROR: {str(e)}")
         typer.echo(str(e), err=True)
 
@@ -135,6 +188,7 @@ def mv(
         ctx: Context,
         source: Path = typer.Argument(None, help="Перемещаемый источник"),
         destination: Path = typer.Argument(None, help="Путь назначения"),
+        jobs: int = typer.Option(1, "-j", "--jobs", help="Количество потоков для переноса между файловыми системами"),
 ) -> None:
     """Команда mv. Перемещает выбранный файл/каталог по указанному пути"""
     if source is None:
@@ -148,7 +202,9 @@ def mv(
 
     try:
         container: Container = get_container(ctx)
-        container.console_service.mv(source, destination)
+        progress = make_progress("mv")
+        container.console_service.mv(source, destination, progress, jobs)
+        logger.info(progress.finish())
 
         true_dst = destination
         if destination.is_dir():
@@ -156,7 +212,7 @@ def mv(
 
         container.history_service.add_undo("mv", str(source), str(true_dst))
         logger.success("SUCCESS")
-    except OSError as e:
+    except (OSError, ValueError) as e:
         logger.error(f"ERROR: {str(e)}")
         typer.echo(str(e), err=True)
 
@@ -166,8 +222,15 @@ def rm(
         ctx: Context,
         path: Path = typer.Argument(None, help="Удалить папки или файлы из каталога"),
         recursive: bool = typer.Option(False, "-r", "-R", help="Необходимый флаг для удаления папок (рекурсивно)"),
+        jobs: int = typer.Option(
+            1, "-j", "--jobs", help="Количество потоков для удаления каталога, если корзина на другой файловой системе",
+        ),
 ) -> None:
-    """Команда rm. Удаляет указанный файл/каталог"""
+    """
+    Команда rm. Удаляет указанный файл/каталог.
+    Обычно объект просто переименовывается в корзину, и -j ни на что не влияет: потоки нужны,
+    только когда корзина на другой файловой системе и каталог после копирования в нее удаляется через remove_tree.
+    """
     if path is None:
         logger.error("ERROR: rm: пропущен операнд")
         typer.echo("rm: пропущен операнд")
@@ -175,18 +238,28 @@ def rm(
 
     try:
         container = get_container(ctx)
+        container.console_service.check_rm(path, recursive, jobs)
 
         if recursive and path.is_dir():
             if not typer.confirm(f"Вы уверены, что хотите удалить каталог '{path}': [y/n]"):
                 typer.echo("Операция отменена")
                 return
 
-        backup_path = container.history_service.backup(path)
-        container.console_service.rm(path, recursive)
+        progress = make_progress("rm")
+        backup_path = container.history_service.backup(path, progress)
+        # Корзина обычно забирает путь сама, мимо console_service.rm, поэтому листинги сбрасываем здесь
+        container.console_service.listings.invalidate(path)
+        logger.info(progress.finish())
+        if path.exists(follow_symlinks=False):
+            # Корзина на другом устройстве: туда сделана копия, и оригинал удаляется отдельным проходом со своим прогрессом
+            removal = make_progress("rm")
+            container.console_service.rm(path, recursive, removal, jobs)
+            logger.info(removal.finish())
 
         container.history_service.add_undo("rm", str(path), backup=str(backup_path), r=recursive)
+        container.history_service.collect_trash_background()
         logger.success("SUCCESS")
-    except OSError as e:
+    except (OSError, ValueError) as e:
         logger.error(f"ERROR: {str(e)}")
         typer.echo(str(e), err=True)
 
@@ -204,7 +277,9 @@ def zip(
 
     try:
         container = get_container(ctx)
-        container.console_service.archive("zip", folder, filename)
+        progress = make_progress("zip")
+        container.console_service.archive("zip", folder, filename, progress)
+        logger.info(progress.finish())
         logger.success("SUCCESS")
     except OSError as e:
         logger.error(f"ERROR: {str(e)}")
@@ -239,7 +314,9 @@ def tar(
 
     try:
         container = get_container(ctx)
-        container.console_service.archive("tar", folder, filename)
+        progress = make_progress("tar")
+        container.console_service.archive("tar", folder, filename, progress)
+        logger.info(progress.finish())
         logger.success("SUCCESS")
     except OSError as e:
         logger.error(f"ERROR: {str(e)}")
@@ -267,9 +344,13 @@ def untar(
 def history(
         ctx: Context,
         length: int = typer.Argument(None, help="Вывести определенное количество последних команд"),
+        query: str = typer.Option(None, "--grep", help="Показать только команды, содержащие строку"),
+        regex: bool = typer.Option(False, "-E", "--regex", help="Искать --grep как регулярку"),
+        command: str = typer.Option(None, "-c", "--command", help="Показать только вызовы указанной команды (cp, rm...)"),
+        unique: bool = typer.Option(False, "-u", "--unique", help="Каждую команду показать один раз, по последнему вызову"),
 ) -> None:
     """Команда history. Выводит команды, которые вводил пользователь, с конца. Данные хранятся в .history в корне проекта"""
-    if length < 0:
+    if length is not None and length < 0:
         logger.error("ERROR: history: введено отрицательное число")
         typer.echo("history: отрицательные числа вводить нельзя")
         return
@@ -278,9 +359,12 @@ def history(
 
     try:
         container: Container = get_container(ctx)
-        commands = container.history_service.get(length)
-        for command in commands[::-1]:
-            sys.stdout.write(command)
+        if query is not None or command is not None or unique:
+            commands = container.history_service.search(query, command, regex, unique, length)
+        else:
+            commands = container.history_service.get(length)
+        for entry in commands[::-1]:
+            sys.stdout.write(entry)
         logger.success("SUCCESS")
     except Exception as e:
         logger.error(f"ERROR: {str(e)}")
@@ -302,7 +386,8 @@ def undo(ctx: Context) -> None:
             case "mv":
                 container.console_service.mv(last_command["destination"], last_command["source"])
             case "rm":
-                container.console_service.mv(last_command["backup_path"], last_command["source"])
+                container.history_service.restore(last_command["backup_path"])
+                container.console_service.listings.invalidate(last_command["source"])
             case "cp":
                 container.console_service.rm(last_command["destination"], last_command["recursive"])
 
@@ -312,6 +397,41 @@ def undo(ctx: Context) -> None:
         typer.echo(str(e), err=True)
 
 
+@app.command()
+def trash(
+        ctx: Context,
+        detailed: bool = typer.Option(False, "-l", "--list", help="Вывести объекты корзины"),
+        gc: bool = typer.Option(False, "--gc", help="Сразу выкинуть все, что не влезает в лимиты корзины"),
+        purge: bool = typer.Option(False, "--purge", help="Полностью очистить корзину"),
+) -> None:
+    """Команда trash. Показывает, сколько места занимает корзина .trash, и позволяет ее почистить"""
+    try:
+        container: Container = get_container(ctx)
+        history_service = container.history_service
+
+        if purge:
+            typer.echo(f"trash: удалено объектов: {history_service.purge_trash()}")
+        elif gc:
+            typer.echo(f"trash: удалено объектов: {history_service.collect_trash(limit=None)}")
+
+        entries = history_service.trash.measure(history_service.trash.entries())
+        if detailed:
+            for entry, size in entries:
+                time = datetime.fromtimestamp(entry.time).strftime("%b %d %H:%M")
+                sys.stdout.write(f"{entry.id} {entry.type:<7} {size:>12} {time} {entry.source}\n")
+
+        total = sum(size for _, size in entries)
+        typer.echo(
+            f"trash: объектов {len(entries)}, {total} байт "
+            f"(лимиты: {history_service.trash_max_bytes} байт, {history_service.trash_max_entries} объектов, "
+            f"{history_service.trash_max_age} с)"
+        )
+        logger.success("SUCCESS")
+    except OSError as e:
+        logger.error(f"ERROR: {e}")
+        typer.echo(str(e), err=True)
+
+
 @app.command()
 def grep(
         ctx: Context,
@@ -319,6 +439,9 @@ def grep(
         path: Path = typer.Argument(None, help="Путь, по которому ищем паттерн"),
         recursive: bool = typer.Option(False, "-r", help="Флаг для рекурсивного поиска по каталогам"),
         ignore: bool = typer.Option(False, "-i", help="Флаг для игнорирования регистра"),
+        max_count: int = typer.Option(None, "-m", "--max-count", help="Остановиться после указанного количества совпадений"),
+        jobs: int = typer.Option(1, "-j", "--jobs", help="Количество процессов для рекурсивного поиска"),
+        fixed: bool = typer.Option(False, "-F", "--fixed-strings", help="Искать паттерн как обычную строку, а не регулярку"),
 ) -> None:
     """Команда grep. Выводит все строки файла(-ов) указанного пути, где какая-то часть удовлетворяет введенному паттерну"""
     if pattern is None or path is None:
@@ -328,7 +451,7 @@ def grep(
 
     try:
         container: Container = get_container(ctx)
-        result = container.console_service.grep(pattern, path, recursive, ignore)
+        result = container.console_service.grep_iter(pattern, path, recursive, ignore, max_count, jobs, fixed)
         for string in result:
             sys.stdout.write(string)
 
@@ -338,6 +461,22 @@ def grep(
         typer.echo(str(e), err=True)
 
 
+@app.command()
+def index(
+        ctx: Context,
+        path: Annotated[Path | None, typer.Argument(help="Каталог, для которого строим индекс")] = None,
+) -> None:
+    """Команда index. Строит/обновляет триграммный индекс каталога, по которому grep -r отсеивает файлы. Данные хранятся в .index в корне проекта"""
+    try:
+        container: Container = get_container(ctx)
+        stats = container.console_service.build_index(path)
+        typer.echo(f"index: обновлено {stats.updated}, без изменений {stats.unchanged}, удалено {stats.removed}")
+        logger.success("SUCCESS")
+    except OSError as e:
+        logger.error(f"ERROR: {e}")
+        typer.echo(str(e), err=True)
+
+
 @app.callback(invoke_without_command=True)
 def base(ctx: typer.Context) -> None:
     """
@@ -351,6 +490,7 @@ def base(ctx: typer.Context) -> None:
         console_service=LinuxConsoleService(),
         history_service=HistoryService(),
     )
+    ctx.call_on_close(ctx.obj.history_service.close)
 
     if ctx.invoked_subcommand is None:
         shell = make_click_shell(ctx, prompt=f"{ctx.obj.console_service.current_path} ", intro="...Терминал запущен...")
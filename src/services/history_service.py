@@ -1,47 +1,222 @@
-from shutil import copy2, copytree
+import gzip
+import os
+import re
+import threading
+from contextlib import suppress
+from itertools import islice
+from os import PathLike
+from shutil import copyfileobj
 from pathlib import Path
 
+from src.enums.constants import (
+    HISTORY_BLOCK_SIZE,
+    HISTORY_COMPRESS_SEGMENTS,
+    HISTORY_KEEP_SEGMENTS,
+    HISTORY_MAX_BYTES,
+    HISTORY_MAX_ENTRIES,
+    TRASH_GC_BATCH,
+    TRASH_MAX_AGE,
+    TRASH_MAX_BYTES,
+    TRASH_MAX_ENTRIES,
+    UNDO_DEPTH,
+    UNDO_JOURNAL,
+)
+from src.utils.history_index import HistoryIndex, open_segment
+from src.utils.progress import Progress
+from src.utils.trash import Trash
+from src.utils.undo_journal import UndoJournal
+
 
 class HistoryService:
-    def __init__(self):
-        project_root = Path(__file__).parent.parent.parent
+    def __init__(
+            self,
+            max_entries: int | None = HISTORY_MAX_ENTRIES,
+            max_bytes: int | None = HISTORY_MAX_BYTES,
+            keep_segments: int | None = HISTORY_KEEP_SEGMENTS,
+            compress: bool = HISTORY_COMPRESS_SEGMENTS,
+            trash_max_bytes: int | None = TRASH_MAX_BYTES,
+            trash_max_age: float | None = TRASH_MAX_AGE,
+            trash_max_entries: int | None = TRASH_MAX_ENTRIES,
+            undo_depth: int = UNDO_DEPTH,
+            root: Path | None = None,
+    ):
+        """
+        max_entries/max_bytes - когда .history дорастает до одного из лимитов, он уезжает в сегмент .history-<первый>-<последний>
+        (при compress - сжатый gzip), а запись продолжается в новый пустой .history. keep_segments - сколько старых сегментов хранить.
+        trash_* - лимиты корзины .trash по размеру, возрасту объектов (в секундах) и их количеству для сборщика мусора.
+        None в любом лимите - без ограничения. undo_depth - бэкапы скольких последних команд undo сборщик мусора не трогает.
+        root - где лежат .history, .trash и журнал undo (по умолчанию корень проекта),
+        чтобы бенчмарки могли работать во временном каталоге.
+        """
+        project_root = Path(__file__).parent.parent.parent if root is None else Path(root)
 
-        self.stack = []
         self.history_file = project_root / ".history"
         self.trash_dir = project_root / ".trash"
 
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.keep_segments = keep_segments
+        self.compress = compress
+        self.trash_max_bytes = trash_max_bytes
+        self.trash_max_age = trash_max_age
+        self.trash_max_entries = trash_max_entries
+        self.undo_depth = undo_depth
+        self.trash_gc: threading.Thread | None = None
+        self.trash_lock = threading.Lock()
+
         self.history_file.touch(exist_ok=True)
-        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        self.trash = Trash(self.trash_dir)
+        self.undo = UndoJournal(project_root / UNDO_JOURNAL, depth=undo_depth)
+
+        self.last_id = self._read_last_id()
+        self.segment_first = self._read_first_id()
+        self.segment_size = self.history_file.stat().st_size
+        self.index: HistoryIndex | None = None
+
+    def segments(self) -> list[Path]:
+        """Старые сегменты истории от старых к новым. Номера в имени дополнены нулями, так что сортировка по имени - это по времени."""
+        return sorted(self.history_file.parent.glob(f"{self.history_file.name}-*"))
+
+    def _tail(self, count: int) -> list[bytes]:
+        """
+        Последние count строк .history (в прямом порядке). Файл читаем с конца блоками по HISTORY_BLOCK_SIZE,
+        пока не наберем нужное количество переводов строки, так что объем чтения зависит от count, а не от размера истории.
+        """
+        blocks: list[bytes] = []
+        newlines = 0
+
+        with open(self.history_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            while pos > 0 and newlines <= count:
+                step = min(HISTORY_BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step)
+                blocks.append(block)
+                newlines += block.count(b"\n")
+
+        lines = b"".join(reversed(blocks)).splitlines(keepends=True)
+        return lines[-count:] if count else []
+
+    def _read_last_id(self) -> int:
+        """
+        Номер последней команды берем из последней строки .history, а не считаем строки.
+        Если .history пуст сразу после ротации - из имени последнего сегмента.
+        Если строка почему-то не начинается с номера - по-старому считаем количество строк (один раз, при запуске).
+        """
+        last = self._tail(1)
+        if not last:
+            segments = self.segments()
+            if segments:
+                return int(segments[-1].name.split(".gz")[0].rsplit("-", 1)[1])
+            return 0
+        try:
+            return int(last[0].split(maxsplit=1)[0])
+        except (IndexError, ValueError):
+            with open(self.history_file, "rb") as f:
+                return sum(1 for _ in f)
+
+    def _read_first_id(self) -> int:
+        """Номер первой команды в текущем .history - чтобы знать, сколько в нем записей, не пересчитывая строки."""
+        with open(self.history_file, "rb") as f:
+            first = f.readline()
+        try:
+            return int(first.split(maxsplit=1)[0])
+        except (IndexError, ValueError):
+            return self.last_id + 1
 
     def add(self, command: str) -> None:
         """
         Функция добавляет команду в историю в файле .history.
-        Чтобы поддерживать индексацию, все время проверяем кол-во строк файла .history.
-        Затем добавляем в файл команду.
+        Номер следующей команды держим в памяти (last_id), поэтому добавление - это просто дозапись в конец файла.
+        Если .history дорос до лимита записей или байт - ротируем его.
         """
-        with open(self.history_file, "r", encoding="utf-8") as f:
-            strings = f.readlines()
-        command_id = len(strings) + 1
-
+        self.last_id += 1
+        string = f"{self.last_id} {command}\n"
         with open(self.history_file, "a", encoding="utf-8") as f:
-            f.writelines(f"{command_id} {command}\n")
+            f.write(string)
+        self.segment_size += len(string.encode("utf-8"))
+
+        entries = self.last_id - self.segment_first + 1
+        if (self.max_entries is not None and entries >= self.max_entries) or \
+                (self.max_bytes is not None and self.segment_size >= self.max_bytes):
+            self.rotate()
+
+    def rotate(self) -> None:
+        """
+        Текущий .history переименовываем в сегмент с номерами первой и последней команды в имени, при необходимости сжимаем gzip.
+        Номера команд продолжаются в новом .history. Лишние старые сегменты сверх keep_segments удаляем.
+        """
+        if self.segment_size == 0:
+            return
+
+        segment = self.history_file.with_name(f"{self.history_file.name}-{self.segment_first:012d}-{self.last_id:012d}")
+        os.replace(self.history_file, segment)
+        self.history_file.touch()
+        self.segment_first = self.last_id + 1
+        self.segment_size = 0
+
+        if self.compress:
+            with open(segment, "rb") as src, gzip.open(f"{segment}.gz", "wb") as dst:
+                copyfileobj(src, dst)
+            segment.unlink()
+
+        if self.keep_segments is not None:
+            segments = self.segments()
+            for old in segments[:max(len(segments) - self.keep_segments, 0)]:
+                old.unlink()
 
     def get(self, length: int) -> list[str]:
         """
-        Функция занимается выводом из файла .history.
-        Считываем строки -> Выводим в зависимости от длины и в указанной последовательности.
+        Функция занимается выводом истории. Строки отдаются с конца (последняя команда первой).
+        Для history N читаем .history с конца и берем только N последних строк. В старые сегменты идем,
+        только если в текущем строк не хватило (или нужна вся история).
         """
         if length == 0:
             return []
 
-        with open(self.history_file, "r", encoding="utf-8") as f:
-            strings = f.readlines()
+        if length == -1:
+            with open(self.history_file, "rb") as f:
+                strings = f.readlines()
+        else:
+            strings = self._tail(length)
+
+        for segment in reversed(self.segments()):
+            if length != -1 and len(strings) >= length:
+                break
+            with open_segment(segment) as f:
+                strings = f.readlines() + strings
+
+        if length != -1:
+            strings = strings[-length:]
+        return [string.decode("utf-8") for string in reversed(strings)]
+
+    def search(
+            self,
+            query: str | None = None,
+            command: str | None = None,
+            regex: bool = False,
+            unique: bool = False,
+            length: int = -1,
+    ) -> list[str]:
+        """
+        Поиск по истории (history --grep/-c/-u). Строки в том же виде и порядке, что и у get: с конца.
+        Индекс строится лениво при первом поиске и дальше только дочитывает новые строки, см. src/utils/history_index.py
+        """
+        if length == 0:
+            return []
+        if self.index is None:
+            self.index = HistoryIndex(self.history_file, self.segments)
 
-        strings = strings[::-1]
+        found = self.index.search(query, command, regex, unique)
+        if length != -1:
+            found = islice(found, length)
 
-        if length > len(strings) or length == -1:
-            return strings
-        return strings[:length]
+        try:
+            return [f"{command_id} {string}\n" for command_id, string in found]
+        except re.error:
+            raise ValueError("history: некорректный формат паттерна")
 
     def add_undo(
             self,
@@ -51,8 +226,8 @@ class HistoryService:
             backup: str = None,
             r: bool = True
     ) -> None:
-        """Добавление определенной команды в стек с нужными параметрами."""
-        self.stack.append({
+        """Добавление определенной команды в журнал undo с нужными параметрами. Журнал лежит в .undo и переживает перезапуск."""
+        self.undo.push({
             "type": command_type,
             "source": src,
             "destination": destination,
@@ -61,27 +236,65 @@ class HistoryService:
         })
 
     def get_undo(self) -> dict | None:
-        """Взятие последней отменяемой функции из стека."""
-        if self.stack:
-            return self.stack.pop()
-        return None
+        """Взятие последней отменяемой функции из журнала."""
+        return self.undo.pop()
+
+    def close(self) -> None:
+        """Досбрасываем журнал undo на диск. Вызывается при завершении консоли."""
+        self.undo.close()
+
+    def backup(self, path: Path, progress: Progress | None = None) -> Path:
+        """
+        Занесение файла в .trash перед удалением: под уникальным uuid-именем и с записью в манифест корзины.
+        В пределах одной файловой системы это os.rename, и удалять исходный путь после этого уже не нужно.
+        Подробности в src/utils/trash.py
+        """
+        return self.trash.put(path, progress)
+
+    def restore(self, backup_path: PathLike[str] | str) -> Path:
+        """Возврат объекта из корзины на место, откуда его удалили (для undo после rm)."""
+        try:
+            return self.trash.restore(Path(backup_path).name)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"undo: бэкапа '{backup_path}' больше нет в корзине (ее очистили через trash --purge "
+                f"или сборщик мусора выкинул бэкап команды старше последних {self.undo_depth}), отменить rm нельзя"
+            )
 
-    def backup(self, path: Path):
+    def collect_trash(self, limit: int | None = TRASH_GC_BATCH) -> int:
         """
-        Реализация занесения файла в .trash перед удалением с помощью copy2 и copytree от shutil в зависимости от типа.
-        Если файл в корзине подобный существует - прикручиваем к имени цифры.
+        Сборка мусора в корзине: выкидываем самые старые объекты, пока не уложимся в лимиты.
+        Бэкапы последних undo_depth команд журнала undo не трогаем: их отмена должна работать. Бэкапы более старых команд
+        выкидываются по общим лимитам, иначе каждый rm навсегда оставался бы в корзине (undo до них скажет, что бэкапа нет).
+        За один проход не больше limit объектов, чтобы одна сборка не затягивалась. Возвращаем, сколько удалили.
+        Под trash_lock: фоновая сборка и trash --purge/--gc не должны удалять одни и те же объекты одновременно.
         """
-        backup_path = self.trash_dir / path.name
+        with self.trash_lock:
+            recent = self.undo.records()[-self.undo_depth:] if self.undo_depth > 0 else []
+            protected = {Path(record["backup_path"]).name for record in recent if record.get("backup_path")}
+            expired = self.trash.expired(self.trash_max_bytes, self.trash_max_age, self.trash_max_entries, protected)
+            if limit is not None:
+                expired = expired[:limit]
+            return self.trash.purge(expired)
+
+    def purge_trash(self) -> int:
+        """Полная очистка корзины (trash --purge). Сначала дожидаемся фоновой сборки, дальше работаем под trash_lock."""
+        if self.trash_gc is not None:
+            self.trash_gc.join()
+        with self.trash_lock:
+            return self.trash.purge()
 
-        counter = 1
-        while backup_path.exists():
-            backup_path = self.trash_dir / f"{backup_path.name}_{counter}"
-            counter += 1
+    def collect_trash_background(self) -> None:
+        """
+        Запуск collect_trash в отдельном потоке, чтобы команда не ждала удаления старых бэкапов.
+        Поток не демон: при выходе интерпретатор дождется конца прохода, и корзина не останется удаленной наполовину.
+        """
+        if self.trash_gc is not None and self.trash_gc.is_alive():
+            return
 
-        if path.exists():
-            if path.is_file():
-                copy2(path, backup_path)
-            else:
-                copytree(path, backup_path)
+        def collect() -> None:
+            with suppress(OSError):
+                self.collect_trash()
 
-        return backup_path
+        self.trash_gc = threading.Thread(target=collect, name="trash-gc")
+        self.trash_gc.start()
@@ -1,45 +1,131 @@
 import os
 import re
-from os import PathLike
 import shutil
+import sqlite3
+import stat
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterator
+from itertools import islice
+from operator import attrgetter
+from os import PathLike
 from pathlib import Path
-from typing import Literal
+from typing import IO, Literal
 
-from enums.constants import BINARY
+from src.enums.constants import CAT_CHUNK_SIZE, COPY_CHUNK_SIZE
 from src.enums.file_mode import FileReadMode
-from src.utils.ls import default_ls, detailed_ls
+from src.utils.archive import make_archive
+from src.utils.cat import head_end, stream_range, tail_start
+from src.utils.copy import (
+    copy_file,
+    copy_tree,
+    move_file,
+    move_tree,
+    same_device,
+    up_to_date,
+)
+from src.utils.follow import follow_file
+from src.utils.grep import (
+    LiteralPattern,
+    compile_pattern,
+    grep_file,
+    grep_tree_file,
+    parallel_grep,
+    walk_files,
+)
+from src.utils.listing_cache import Listing, ListingCache, signature
+from src.utils.ls import (
+    default_ls,
+    detailed_ls,
+    detailed_ls_names,
+    page_entries,
+    scan_entries,
+    stream_ls,
+)
+from src.utils.progress import Progress
+from src.utils.remove import remove_tree
+from src.utils.sync import SyncStats, sync_file, sync_tree
+from src.utils.trigram_index import IndexStats, TrigramIndex
 
 
 class LinuxConsoleService:
     def __init__(self):
+        project_root = Path(__file__).parent.parent.parent
+
         self.current_path = Path.cwd()
+        self.index = TrigramIndex(project_root / ".index")
+        self.listings = ListingCache()
+
+    def check_ls(self, path: PathLike[str] | str | None) -> tuple[Path, os.stat_result]:
+        """Путь для ls (по умолчанию текущий каталог) и его stat. Проверяем, что это существующий каталог."""
+        directory = self.current_path if path is None else Path(path)
+
+        try:
+            directory_stat = directory.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ls: '{directory}': Каталог не существует")
+        if not stat.S_ISDIR(directory_stat.st_mode):
+            raise NotADirectoryError(f"ls: '{directory}': Это не каталог")
+        return directory, directory_stat
 
     def ls(self, path: PathLike[str] | str, hidden: bool, detailed: bool) -> list[str]:
         """
-        Обрабатываем путь. Перебираем в список файлы через iterdir. Убираем если нет флага -а скрытые.
+        Обрабатываем путь. Перебираем каталог одним проходом os.scandir. Убираем если нет флага -а скрытые.
         Если нет флага -l, выполняем функцию обычного вывода. Если есть, то детализированного.
         Эти обе функции находятся в src/utils/ls.py
+        Листинги кэшируются в self.listings (src/utils/listing_cache.py): пока у каталога тот же inode и mtime,
+        повторный ls стоит одного stat, а с -l - еще stat на каждый файл, но без чтения каталога и сортировки.
         """
-        if path is None:
-            path = self.current_path
-        else:
-            path = Path(path)
+        path, directory_stat = self.check_ls(path)
+
+        listing = self.listings.get(path, hidden, directory_stat)
+        if listing is None:
+            with os.scandir(path) as iterator:
+                entries = [entry for entry in iterator if hidden or not entry.name.startswith(".")]
+            entries.sort(key=attrgetter("name"))
+
+            listing = Listing(signature(directory_stat), [entry.name for entry in entries])
+            self.listings.put(path, hidden, directory_stat, listing)
+            if detailed:
+                return detailed_ls(entries)
+        elif detailed:
+            return detailed_ls_names(path, listing.names)
+
+        if listing.lines is None:
+            listing.lines = default_ls(listing.names)
+        return list(listing.lines)
+
+    def ls_stream(
+            self,
+            path: PathLike[str] | str,
+            hidden: bool,
+            detailed: bool,
+            unsorted: bool = False,
+            limit: int | None = None,
+            offset: int = 0,
+    ) -> Iterator[str]:
+        """
+        ls для огромных каталогов, где весь листинг не нужен или не помещается в разумное время.
+        unsorted (флаг -U): строки отдаются по мере обхода scandir, без сортировки, так что первая строка
+        появляется сразу, а память не растет с размером каталога.
+        limit/offset (--limit/--offset): страница отсортированного листинга. Если каталог есть в кэше листингов,
+        страница просто вырезается из него, иначе выбирается ограниченной кучей (page_entries из src/utils/ls.py).
+        """
+        path, directory_stat = self.check_ls(path)
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("ls: --limit и --offset не могут быть отрицательными")
 
-        if not path.exists():
-            raise FileNotFoundError(f"ls: '{path}': Каталог не существует")
-        if not path.is_dir():
-            raise NotADirectoryError(f"grep: '{path}': Это не каталог")
+        end = None if limit is None else offset + limit
+        if unsorted:
+            return stream_ls(islice(scan_entries(path, hidden), offset, end), detailed)
 
-        items = [item.name for item in path.iterdir()]
-        if not hidden:
-            items = [item for item in items if not item.startswith(".")]
-        items.sort()
+        listing = self.listings.get(path, hidden, directory_stat)
+        if listing is not None:
+            names = listing.names[offset:end]
+            return iter(detailed_ls_names(path, names) if detailed else default_ls(names))
 
-        if detailed:
-            result = detailed_ls(path, items)
-        else:
-            result = default_ls(items)
-        return result
+        page = page_entries(scan_entries(path, hidden), offset, limit)
+        return iter(detailed_ls(page) if detailed else default_ls([entry.name for entry in page]))
 
     def cd(self, path: PathLike[str] | str) -> None:
         """
@@ -74,6 +160,17 @@ class LinuxConsoleService:
             raise OSError(f"Ошибка: {e}")
         self.current_path = path
 
+    def check_cat(self, file: PathLike[str] | str) -> Path:
+        """Проверки перед чтением: файл существует, это не каталог, есть право на чтение."""
+        path = Path(file)
+        if not path.exists(follow_symlinks=True):
+            raise FileNotFoundError(f"cat: '{path}': Файл не существует")
+        if not path.is_file():
+            raise IsADirectoryError(f"cat: '{path}': Это не файл")
+        if not os.access(path, os.R_OK):
+            raise PermissionError(f"cat: {path}; Отказано в доступе")
+        return path
+
     def cat(
             self,
             file: PathLike[str] | str,
@@ -82,14 +179,9 @@ class LinuxConsoleService:
         """
         Обрабатываем путь к файлу и разрешение чтения.
         Смотрим, есть ли флаг -b и выполняем соотвественные кейсы с чтением.
+        Файл читается целиком в память, поэтому команда cat выводит файлы через cat_stream.
         """
-        path = Path(file)
-        if not path.exists(follow_symlinks=True):
-            raise FileNotFoundError(f"cat: '{path}': Файл не существует")
-        if not path.is_file():
-            raise IsADirectoryError(f"cat: '{path}': Это не файл")
-        if not os.access(path, os.R_OK):
-            raise PermissionError(f"cat: {path}; Отказано в доступе")
+        path = self.check_cat(file)
 
         try:
             match mode:
@@ -100,15 +192,73 @@ class LinuxConsoleService:
         except Exception as e:
             raise OSError(f"Ошибка: {e}")
 
+    def cat_stream(
+            self,
+            file: PathLike[str] | str,
+            out: IO[bytes],
+            mode: Literal[FileReadMode.string, FileReadMode.bytes] = FileReadMode.string,
+            offset: int = 0,
+            length: int | None = None,
+            head: int | None = None,
+            tail: int | None = None,
+            chunk_size: int = CAT_CHUNK_SIZE,
+            follow: bool = False,
+            stop: threading.Event | None = None,
+    ) -> int:
+        """
+        Потоковый cat: файл выводится в out кусками по chunk_size (в бинарном режиме через sendfile, если получится),
+        так что память не зависит от размера файла. Возвращает, сколько байт выведено.
+        Диапазон задается либо в байтах (offset и length), либо в строках (первые head или последние tail строк).
+        Диапазон байт выводится как есть, без проверки UTF-8 (как с -b): его границы не обязаны попадать на границы символов.
+        До начала диапазона не читаем, а переходим через seek. Функции находятся в src/utils/cat.py
+        С follow после вывода ждем дозаписи в файл, как tail -f (follow_file из src/utils/follow.py), пока не выставлен stop.
+        """
+        path = self.check_cat(file)
+        if head is not None and tail is not None:
+            raise ValueError("cat: --head и --tail нельзя указать вместе")
+        if (head is not None or tail is not None) and (offset or length is not None):
+            raise ValueError("cat: диапазон строк нельзя совмещать с --offset/--length")
+        if offset < 0 or (length is not None and length < 0) or (head or 0) < 0 or (tail or 0) < 0:
+            raise ValueError("cat: диапазон не может быть отрицательным")
+        if chunk_size < 1:
+            raise ValueError("cat: размер куска должен быть положительным")
+        if follow and (head is not None or length is not None):
+            raise ValueError("cat: --follow выводит файл до конца, его нельзя совмещать с --head/--length")
+
+        try:
+            with open(path, "rb") as f:
+                start, end = offset, None if length is None else offset + length
+                if head is not None:
+                    start, end = 0, head_end(f, head, chunk_size)
+                elif tail is not None:
+                    start = tail_start(f, tail, chunk_size)
+                # Диапазон байт может резать символы пополам, поэтому он выводится как есть, как с -b
+                text = mode == FileReadMode.string and not offset and length is None
+                written = stream_range(f, out, start, end, text, chunk_size)
+                if follow:
+                    f.seek(start + written)
+                    written += follow_file(path, f, out, text, stop)
+                return written
+        except UnicodeDecodeError as e:
+            raise OSError(f"Ошибка: {e}")
+
     def cp(
             self,
             src: PathLike[str] | str,
             dst: PathLike[str] | str,
             recursive: bool,
-    ) -> None:
+            jobs: int = 1,
+            chunk_size: int = COPY_CHUNK_SIZE,
+            progress: Progress | None = None,
+            resume: bool = False,
+    ) -> Counter[str]:
         """
-        Обрабатываем путь источника. Если файл то выполняем copy2 от shutil(как в настоящем линуксе).
-        Если папка и есть флаг нужный: copytree тоже от shutil.
+        Обрабатываем путь источника. Если файл то выполняем copy_file (как copy2 от shutil, как в настоящем линуксе).
+        Если папка и есть флаг нужный: copy_tree, флаг -j N раздает файлы N потокам.
+        Данные копируются средствами ядра (reflink, copy_file_range), а если нельзя - через буфер chunk_size.
+        Обе функции в src/utils/copy.py. Возвращаем, сколько файлов каким способом скопировано, для лога.
+        В progress (src/utils/progress.py) копирование отчитывается о байтах и файлах.
+        С resume (флаг --resume) уже скопированные файлы пропускаются, см. CopyCheckpoint и up_to_date там же.
         """
         src_path = Path(src)
         dst_path = Path(dst)
@@ -117,60 +267,197 @@ class LinuxConsoleService:
             raise FileNotFoundError(f"cp: '{src}': Файл не существует")
         if src_path.is_dir() and dst_path.exists() and dst_path.is_file():
             raise IsADirectoryError("cp: невозможно перезаписать некаталоговый объект каталогом")
+        if jobs < 1:
+            raise ValueError("cp: -j: количество потоков должно быть положительным")
+        if chunk_size < 1:
+            raise ValueError("cp: --chunk-size: размер куска должен быть положительным")
 
         try:
+            if progress is not None:
+                progress.expect_tree(src_path)
             if src_path.is_file():
-                shutil.copy2(src_path, dst_path)
+                target = dst_path / src_path.name if dst_path.is_dir() else dst_path
+                if resume and up_to_date(src_path.stat(), str(target)):
+                    return Counter(["skipped"])
+                return Counter([copy_file(src_path, dst_path, chunk_size, progress)])
             elif src_path.is_dir():
                 if recursive:
-                    shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
+                    if dst_path.resolve().is_relative_to(src_path.resolve()):
+                        raise ValueError(f"cp: невозможно скопировать каталог '{src}' в самого себя")
+                    return copy_tree(src_path, dst_path, jobs, chunk_size, progress, resume)
                 else:
                     raise IsADirectoryError(f"cp: не указан -r; пропускается каталог '{src_path}'")
             else:
                 raise ValueError(f"cp: невозможно скопировать '{src}'; Неподдерживаемый тип файла")
         except PermissionError:
             raise PermissionError("cp: Отказано в доступе")
+        finally:
+            self.listings.invalidate(dst_path)
+
+    def sync(
+            self,
+            src: PathLike[str] | str,
+            dst: PathLike[str] | str,
+            recursive: bool,
+            checksum: bool = False,
+            delete: bool = False,
+            jobs: int = 1,
+            progress: Progress | None = None,
+            newer: bool = False,
+    ) -> SyncStats:
+        """
+        cp --sync: те же проверки, что у cp, но копируется только изменившееся (размер и mtime,
+        с --checksum еще и содержимое поблочно), большие файлы переписываются только в отличающихся блоках.
+        С --delete из каталога назначения удаляется все, чего нет в источнике.
+        С newer - cp -u в смысле GNU cp: файл копируется целиком, только если назначения нет или источник новее.
+        Вся логика в src/utils/sync.py
+        """
+        src_path = Path(src)
+        dst_path = Path(dst)
+
+        if not src_path.exists():
+            raise FileNotFoundError(f"cp: '{src}': Файл не существует")
+        if src_path.is_dir() and dst_path.exists() and dst_path.is_file():
+            raise IsADirectoryError("cp: невозможно перезаписать некаталоговый объект каталогом")
+        if jobs < 1:
+            raise ValueError("cp: -j: количество потоков должно быть положительным")
+        if newer and (checksum or delete):
+            raise ValueError("cp: --checksum и --delete не сочетаются с -u")
+
+        try:
+            if progress is not None:
+                progress.expect_tree(src_path)
+            if src_path.is_file():
+                target = dst_path / src_path.name if dst_path.is_dir() else dst_path
+                changed, transferred, skipped = sync_file(src_path, target, checksum, progress=progress, newer=newer)
+                return SyncStats(int(changed), int(not changed), 0, transferred, skipped)
+            elif src_path.is_dir():
+                if not recursive:
+                    raise IsADirectoryError(f"cp: не указан -r; пропускается каталог '{src_path}'")
+                if dst_path.resolve().is_relative_to(src_path.resolve()):
+                    raise ValueError(f"cp: невозможно скопировать каталог '{src}' в самого себя")
+                return sync_tree(src_path, dst_path, checksum, delete, jobs, progress, newer)
+            else:
+                raise ValueError(f"cp: невозможно скопировать '{src}'; Неподдерживаемый тип файла")
+        except PermissionError:
+            raise PermissionError("cp: Отказано в доступе")
+        finally:
+            self.listings.invalidate(dst_path)
 
-    def mv(self, src: PathLike[str] | str, dst: PathLike[str] | str) -> None:
-        """Обработка пути источника. И выполнение перемещения с помощью shutil"""
+    def mv(
+            self,
+            src: PathLike[str] | str,
+            dst: PathLike[str] | str,
+            progress: Progress | None = None,
+            jobs: int = 1,
+    ) -> None:
+        """
+        Обработка пути источника. В пределах одной файловой системы перемещение - это rename через shutil.move.
+        Между разными файловыми системами (проверяем заранее по st_dev) каталог переносится через move_tree
+        из src/utils/copy.py: файлы копируются на пуле из jobs потоков (флаг -j), и каждый исходный файл удаляется сразу,
+        как только проверена его копия. О ходе переноса отчитываемся в progress.
+        """
         src_path = Path(src)
         dst_path = Path(dst)
 
         if not src_path.exists():
             raise FileNotFoundError(f"mv: '{src}': Файл не существует")
+        if jobs < 1:
+            raise ValueError("mv: -j: количество потоков должно быть положительным")
+
+        target = dst_path / src_path.name if dst_path.is_dir() else dst_path
 
         try:
-            shutil.move(src_path, dst_path)
+            if src_path.is_symlink() or same_device(src_path, target):
+                shutil.move(src_path, dst_path)
+                return
+
+            if progress is not None:
+                progress.expect_tree(src_path)
+            if src_path.is_dir():
+                if target.exists():
+                    raise FileExistsError(f"mv: невозможно переместить '{src}' в '{target}': Каталог уже существует")
+                move_tree(src_path, target, jobs, progress=progress)
+            else:
+                move_file(str(src_path), str(target), progress=progress)
         except PermissionError:
             raise PermissionError("mv: Отказано в доступе")
+        finally:
+            self.listings.invalidate(src_path, target)
 
-    def rm(self, path: PathLike[str] | str, recursive: bool) -> None:
-        """Обрабатотка пути. Remove от os, если просто файл. Иначе удаление через rmtree от shutil(если флаг стоит)"""
+    def check_rm(self, path: PathLike[str] | str, recursive: bool, jobs: int = 1) -> None:
+        """
+        Проверки перед удалением: путь существует, это не корень, для каталога указан -r, тип файла понятный, -j положительный.
+        Вынесены из rm, чтобы команда rm могла убедиться, что удалять можно, еще до переноса в корзину.
+        """
         path = Path(path)
         if not path.exists():
-            raise FileNotFoundError(f"mv: '{path}': Файл не существует")
+            raise FileNotFoundError(f"rm: '{path}': Файл не существует")
         if str(path) in ("..", "/") or path.resolve() == Path("/"):
             raise PermissionError(f"rm: невозможно удалить '{path}'; Отказано в доступе")
+        if path.is_dir() and not recursive:
+            raise IsADirectoryError(f"rm: невозможно удалить '{path}'; Это каталог")
+        if not path.is_file() and not path.is_dir():
+            raise TypeError(f"rm: невозможно удалить '{path}'; Неизвестный тип файла")
+        if jobs < 1:
+            raise ValueError("rm: -j: количество потоков должно быть положительным")
+
+    def rm(
+            self,
+            path: PathLike[str] | str,
+            recursive: bool,
+            progress: Progress | None = None,
+            jobs: int = 1,
+    ) -> None:
+        """
+        Обрабатотка пути. Remove от os, если просто файл или ссылка. Иначе удаление через remove_tree из src/utils/remove.py
+        (если флаг стоит): файлы удаляются относительно дескриптора каталога, поддеревья раздаются пулу из jobs потоков (флаг -j),
+        каталоги удаляются снизу вверх. Об удаленных файлах отчитываемся в progress.
+        """
+        path = Path(path)
+        self.check_rm(path, recursive, jobs)
         try:
-            if path.is_file():
+            if path.is_file() or path.is_symlink():
                 os.remove(path)
-            elif path.is_dir():
-                if recursive:
-                    shutil.rmtree(path)
-                else:
-                    raise IsADirectoryError(f"rm: невозможно удалить '{path}'; Это каталог")
             else:
-                raise TypeError(f"rm: невозможно удалить '{path}'; Неизвестный тип файла")
+                if progress is not None:
+                    progress.expect_tree(path)
+                remove_tree(path, progress, jobs)
         except PermissionError:
             raise PermissionError(f"rm: невозможно удалить '{path}'; Отказано в доступе")
+        finally:
+            self.listings.invalidate(path)
+
+    def build_index(self, path: PathLike[str] | str | None) -> IndexStats:
+        """
+        Построение или обновление триграммного индекса каталога для grep -r (команда index).
+        Перечитываются только новые и изменившиеся по mtime/size файлы, см. src/utils/trigram_index.py
+        """
+        directory = self.current_path if path is None else Path(path)
+
+        if not directory.exists():
+            raise FileNotFoundError(f"index: '{directory}': Каталог не существует")
+        if not directory.is_dir():
+            raise NotADirectoryError(f"index: '{directory}': Это не каталог")
+
+        try:
+            return self.index.update(directory)
+        except sqlite3.Error as e:
+            raise OSError(f"index: не удалось обновить индекс: {e}")
 
     # ФУНКЦИИ for Medium level:
 
-    def archive(self, format: str, folder: PathLike[str] | str, name: PathLike[str] | str) -> None:
+    def archive(
+            self,
+            format: str,
+            folder: PathLike[str] | str,
+            name: PathLike[str] | str,
+            progress: Progress | None = None,
+    ) -> None:
         """
         Функция архивации, является универсальной для zip и tar.
         Обрабатываем каталог указанный. Потом удаляем расширение у желаемого названия архива.
-        И выполняем make_Archive от shutil.
+        И выполняем make_archive из src/utils/archive.py - как у shutil, только с отчетом в progress о каждом файле.
         """
         base_dir = Path(folder)
         archive_path = Path(name)
@@ -182,7 +469,9 @@ class LinuxConsoleService:
 
         try:
             base_name = str(archive_path.with_suffix(''))
-            shutil.make_archive(base_name, format, base_dir)
+            if progress is not None:
+                progress.expect_tree(base_dir)
+            make_archive(format, base_name, str(base_dir), progress)
         except PermissionError:
             raise PermissionError(f"{format}: Отказано в доступе")
         except (ValueError, shutil.ReadError):
@@ -210,55 +499,85 @@ class LinuxConsoleService:
         except Exception as e:
             raise OSError(f"Ошибка: {e}")
 
-    def grep(self, pattern: str, path: PathLike[str] | str, r: bool, i: bool) -> list[str]:
+    def grep(
+            self,
+            pattern: str,
+            path: PathLike[str] | str,
+            r: bool,
+            i: bool,
+            max_count: int | None = None,
+            jobs: int = 1,
+            fixed: bool = False,
+    ) -> list[str]:
+        """
+        Обертка над grep_iter для тех, кому нужен весь результат разом (тесты, например).
+        В самой команде grep используется grep_iter, чтобы не копить совпадения в памяти.
+        """
+        return list(self.grep_iter(pattern, path, r, i, max_count, jobs, fixed))
+
+    def grep_iter(
+            self,
+            pattern: str,
+            path: PathLike[str] | str,
+            r: bool,
+            i: bool,
+            max_count: int | None = None,
+            jobs: int = 1,
+            fixed: bool = False,
+    ) -> Iterator[str]:
         """
         Обрабатываем путь и паттерн, смотрим на флаг -i.
-        Указан файл: проходимся по нему, индексируя строки, и ищем по регулярке совпадения.
-        Указан каталог и -r: рекурсивный проход обеспечивает os.walk. Если попадется бинарник или еще какая-нибудь фигня - skip.
-        На нормальных файлах такая же обработка, только путь указываем относительно исхдодного каталога.
+        Все проверки делаем сразу(не лениво), чтобы ошибки вылетали до первой строки вывода.
+        Возвращаем генератор: совпадения отдаются по мере нахождения, а не списком в конце.
+        Флаг -m ограничивает общее количество выведенных строк: как только набрали max_count,
+        генератор больше не дергается и обход дерева дальше не идет.
+        Флаг -j N раскидывает файлы рекурсивного поиска по N процессам (см. parallel_grep в src/utils/grep.py),
+        порядок вывода при этом такой же, как и без него.
+        Флаг -F ищет паттерн как обычную строку. Паттерн без спецсимволов регулярок тоже ищется как строка,
+        без флага (см. compile_pattern в src/utils/grep.py).
+        Если для каталога построен индекс командой index, поиск строки при -r читает только файлы-кандидаты из него.
         """
         path = Path(path)
-        ignore_flag = 0
-        if i:
-            ignore_flag = re.IGNORECASE
 
         if not path.exists():
             raise FileNotFoundError(f"grep: '{path}': Файл не существует")
+        if max_count is not None and max_count < 0:
+            raise ValueError("grep: -m: отрицательные числа вводить нельзя")
+        if jobs < 1:
+            raise ValueError("grep: -j: количество процессов должно быть положительным")
 
         try:
-            pattern = re.compile(pattern, ignore_flag)
+            compiled = compile_pattern(pattern, i, fixed)
         except Exception:
             raise ValueError("grep: некорректный формат паттерна")
 
-        result: list[str] = []
-
         if path.is_file():
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                for i, string in enumerate(f, 1):
-                    if pattern.search(string):
-                        result.append(f"{path}:{i}:{string}")
-
+            result = grep_file(compiled, path, path)
         elif path.is_dir():
-            if r:
-                for dirpath, _, filenames in os.walk(path):
-                    for file in filenames:
-                        file_path = Path(dirpath) / file
-
-                        if file_path.suffix in BINARY:
-                            result.append(f"grep: {file_path.relative_to(path)}: двоичный файл совпадает\n")
-                            continue
-
-                        try:
-                            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                                for i, string in enumerate(f, 1):
-                                    if pattern.search(string):
-                                        relative_path = file_path.relative_to(path)
-                                        result.append(f"{relative_path}:{i}:{string}")
-                        except OSError:
-                            continue
-            else:
+            if not r:
                 raise IsADirectoryError(f"grep: '{path}': Это каталог")
+
+            keep = None
+            if fixed or isinstance(compiled, LiteralPattern):
+                keep = self.index.file_filter(path, pattern, i)
+
+            if jobs > 1:
+                result = parallel_grep(compiled, path, jobs, keep)
+            else:
+                result = self._grep_dir(compiled, path, keep)
         else:
             raise ValueError(f"grep: '{path}': Не является файлом или каталогом")
 
+        if max_count is not None:
+            result = islice(result, max_count)
         return result
+
+    @staticmethod
+    def _grep_dir(
+            pattern: re.Pattern | LiteralPattern,
+            path: Path,
+            keep: Callable[[Path, Path], bool] | None = None,
+    ) -> Iterator[str]:
+        """Последовательный рекурсивный поиск: файлы по одному, путь указываем относительно исходного каталога."""
+        for file_path in walk_files(path, keep):
+            yield from grep_tree_file(pattern, file_path, file_path.relative_to(path))
@@ -0,0 +1,48 @@
+import os
+import tarfile
+import zipfile
+
+from src.utils.progress import Progress
+
+
+def make_zip(base_name: str, root_dir: str, progress: Progress | None = None) -> str:
+    """Zip-архив содержимого root_dir, как shutil.make_archive(..., "zip"), но с отчетом о каждом добавленном файле."""
+    archive_name = base_name + ".zip"
+    with zipfile.ZipFile(archive_name, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for dirpath, dirnames, filenames in os.walk(root_dir):
+            arcdir = os.path.relpath(dirpath, root_dir)
+            for name in sorted(dirnames):
+                zf.write(os.path.join(dirpath, name), os.path.normpath(os.path.join(arcdir, name)))
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if not os.path.isfile(path):
+                    continue
+                zf.write(path, os.path.normpath(os.path.join(arcdir, name)))
+                if progress is not None:
+                    progress.add(zf.filelist[-1].file_size, 1)
+    return archive_name
+
+
+def make_tar(base_name: str, root_dir: str, progress: Progress | None = None) -> str:
+    """Tar-архив содержимого root_dir, как shutil.make_archive(..., "tar"). Прогресс считаем в filter у tarfile.add."""
+    archive_name = base_name + ".tar"
+
+    def report(member: tarfile.TarInfo) -> tarfile.TarInfo:
+        if progress is not None and member.isreg():
+            progress.add(member.size, 1)
+        return member
+
+    with tarfile.open(archive_name, "w|") as tar:
+        tar.add(root_dir, os.curdir, filter=report)
+    return archive_name
+
+
+def make_archive(format: str, base_name: str, root_dir: str, progress: Progress | None = None) -> str:
+    """Замена shutil.make_archive для zip и tar: те же архивы, но с отчетом о прогрессе."""
+    match format:
+        case "zip":
+            return make_zip(base_name, root_dir, progress)
+        case "tar":
+            return make_tar(base_name, root_dir, progress)
+        case _:
+            raise ValueError(f"unknown archive format '{format}'")
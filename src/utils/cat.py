@@ -0,0 +1,137 @@
+import codecs
+import errno
+import os
+from typing import IO
+
+from src.enums.constants import CAT_CHUNK_SIZE
+from src.utils.copy import UNSUPPORTED, kernel_copy_allowed
+
+
+def head_end(f: IO[bytes], lines: int, chunk_size: int = CAT_CHUNK_SIZE) -> int:
+    """Смещение конца первых lines строк (сразу за lines-м переводом строки). Читаем с начала, только пока не наберется."""
+    if lines <= 0:
+        return 0
+    f.seek(0)
+    offset = 0
+    while chunk := f.read(chunk_size):
+        count = chunk.count(b"\n")
+        if count >= lines:
+            position = -1
+            for _ in range(lines):
+                position = chunk.index(b"\n", position + 1)
+            return offset + position + 1
+        lines -= count
+        offset += len(chunk)
+    return offset
+
+
+def tail_start(f: IO[bytes], lines: int, chunk_size: int = CAT_CHUNK_SIZE) -> int:
+    """
+    Смещение начала последних lines строк. Файл читается блоками с конца, как в tail:
+    для последних строк огромного лога читаем только его хвост. Перевод строки в самом конце файла новую строку не начинает.
+    """
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if lines <= 0:
+        return end
+    position = end
+    skip_last = True
+    while position > 0:
+        size = min(chunk_size, position)
+        position -= size
+        f.seek(position)
+        chunk = f.read(size)
+        if skip_last:
+            skip_last = False
+            if chunk.endswith(b"\n"):
+                chunk = chunk[:-1]
+        index = len(chunk)
+        while (index := chunk.rfind(b"\n", 0, index)) != -1:
+            lines -= 1
+            if lines == 0:
+                return position + index + 1
+    return 0
+
+
+def send_range(fsrc: IO[bytes], out: IO[bytes], start: int, end: int | None, chunk_size: int = CAT_CHUNK_SIZE) -> int | None:
+    """
+    Отдача диапазона файла через os.sendfile: данные идут из page cache прямо в stdout (файл или канал), минуя процесс.
+    Возвращает, сколько байт отправлено, или None, если sendfile для этой пары не подходит.
+    """
+    if not hasattr(os, "sendfile") or not kernel_copy_allowed(fsrc) or not kernel_copy_allowed(out):
+        return None
+    out.flush()
+    offset = start
+    try:
+        while end is None or offset < end:
+            count = chunk_size if end is None else min(chunk_size, end - offset)
+            sent = os.sendfile(out.fileno(), fsrc.fileno(), offset, count)
+            if sent == 0:
+                break
+            offset += sent
+    except OSError as e:
+        if offset > start or e.errno not in UNSUPPORTED | {errno.ESPIPE}:
+            raise
+        return None
+    # Как и copy_file_range, sendfile на sysfs и FUSE может сразу отдать 0: тогда выводим через буфер
+    return offset - start if offset > start else None
+
+
+def stream_range(
+        fsrc: IO[bytes],
+        out: IO[bytes],
+        start: int = 0,
+        end: int | None = None,
+        text: bool = False,
+        chunk_size: int = CAT_CHUNK_SIZE,
+) -> int:
+    """
+    Вывод байт [start, end) открытого файла в out кусками по chunk_size, так что память не зависит от размера файла.
+    В бинарном режиме сначала пробуем sendfile, а если нельзя - цикл read/write кусками по chunk_size.
+    В текстовом режиме см. stream_text. Возвращает, сколько байт выведено.
+    """
+    if text:
+        return stream_text(fsrc, out, start, end, chunk_size)
+    if (sent := send_range(fsrc, out, start, end, chunk_size)) is not None:
+        return sent
+
+    fsrc.seek(start)
+    written = 0
+    while end is None or start + written < end:
+        size = chunk_size if end is None else min(chunk_size, end - start - written)
+        if not (chunk := fsrc.read(size)):
+            break
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def stream_text(fsrc: IO[bytes], out: IO[bytes], start: int = 0, end: int | None = None, chunk_size: int = CAT_CHUNK_SIZE) -> int:
+    """
+    Текстовый вывод: каждый кусок проверяется инкрементальным декодером UTF-8 до того, как попадет в out
+    (некорректный текст - ошибка, как раньше у read_text), но пишутся исходные байты, без лишней копии строкой.
+    Следующий кусок читается заранее, поэтому последний кусок проверяется с final=True еще до вывода:
+    оборванный в конце символ не печатается наполовину. Файл меньше куска при ошибке не выводится вовсе,
+    а в файле больше куска ошибка в середине обнаружится, только когда до нее дойдет вывод.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    fsrc.seek(start)
+    position = start
+
+    def read() -> bytes:
+        nonlocal position
+        size = chunk_size if end is None else min(chunk_size, end - position)
+        chunk = fsrc.read(size) if size > 0 else b""
+        position += len(chunk)
+        return chunk
+
+    written = 0
+    chunk = read()
+    while chunk:
+        following = read()
+        decoder.decode(chunk, final=not following)
+        out.write(chunk)
+        written += len(chunk)
+        chunk = following
+    decoder.decode(b"", final=True)
+    return written
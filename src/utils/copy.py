@@ -0,0 +1,395 @@
+import errno
+import fcntl
+import json
+import os
+import shutil
+import stat
+import sys
+import threading
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+from functools import partial
+from os import PathLike
+from typing import IO, Self
+
+from src.enums.constants import (
+    COPY_CHECKPOINT_BATCH,
+    COPY_CHUNK_SIZE,
+    COPY_TASKS_PER_WORKER,
+)
+from src.utils.progress import Progress
+
+# ioctl FICLONE из linux/fs.h: файл назначения становится клоном источника (reflink), данные не копируются
+FICLONE = 0x40049409
+
+# Ошибки, с которыми copy_file_range/FICLONE просто не поддерживаются для этой пары файлов
+UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF, errno.EPERM}
+
+
+def kernel_copy_allowed(f: IO[bytes]) -> bool:
+    """Можно ли отдать дескриптор файла ядру: только на Linux и только если у объекта есть дескриптор (у BytesIO его нет)."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        f.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+def reflink(fsrc: IO[bytes], fdst: IO[bytes]) -> bool:
+    """FICLONE: fdst становится клоном fsrc (btrfs, xfs), копируются только метаданные. False, если для этой пары нельзя."""
+    if not kernel_copy_allowed(fsrc) or not kernel_copy_allowed(fdst):
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno not in UNSUPPORTED:
+            raise
+        return False
+    return True
+
+
+def copy_data(
+        fsrc: IO[bytes],
+        fdst: IO[bytes],
+        chunk_size: int = COPY_CHUNK_SIZE,
+        progress: Progress | None = None,
+) -> str:
+    """
+    Копирование содержимого открытого файла, от самого дешевого способа к самому дорогому. Возвращает, какой сработал:
+    reflink - FICLONE, файл становится клоном (btrfs, xfs): копируются только метаданные;
+    copy_file_range - данные копирует ядро, не поднимая их в процесс (а NFS/CIFS могут скопировать вообще на сервере);
+    buffer - обычный цикл read/write кусками по chunk_size, как в shutil.copyfileobj.
+    О прогрессе сообщаем по кускам chunk_size, так что и один большой файл видно по ходу копирования.
+    """
+    # У файлов из /proc и подобных размер 0, хотя данные есть: copy_file_range отдал бы для них пустой файл
+    if kernel_copy_allowed(fsrc) and kernel_copy_allowed(fdst) and os.fstat(fsrc.fileno()).st_size > 0:
+        if reflink(fsrc, fdst):
+            if progress is not None:
+                progress.add(os.fstat(fsrc.fileno()).st_size)
+            return "reflink"
+
+        if hasattr(os, "copy_file_range"):
+            copied = 0
+            try:
+                while (sent := os.copy_file_range(fsrc.fileno(), fdst.fileno(), chunk_size)) > 0:
+                    copied += sent
+                    if progress is not None:
+                        progress.add(sent)
+            except OSError as e:
+                if copied or e.errno not in UNSUPPORTED:
+                    raise
+            # sysfs, FUSE и часть сетевых файловых систем отдают 0 сразу, хотя данные есть: тогда копируем через буфер,
+            # как это делает и shutil
+            if copied:
+                return "copy_file_range"
+
+    while chunk := fsrc.read(chunk_size):
+        fdst.write(chunk)
+        if progress is not None:
+            progress.add(len(chunk))
+    return "buffer"
+
+
+def copy_file(
+        src: PathLike[str] | str,
+        dst: PathLike[str] | str,
+        chunk_size: int = COPY_CHUNK_SIZE,
+        progress: Progress | None = None,
+) -> str:
+    """
+    Замена shutil.copy2: то же поведение (копия в каталог под тем же именем, права и время как у источника),
+    но содержимое копируется через copy_data. Возвращает способ копирования для лога.
+    Как и shutil.copyfile, FIFO не копируем (open() заблокировался бы навсегда) и бросаем SpecialFileError,
+    а заодно и устройства с сокетами: копируется только содержимое обычных файлов.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    src_mode = os.stat(src).st_mode
+    if stat.S_ISFIFO(src_mode):
+        raise shutil.SpecialFileError(f"`{src}` is a named pipe")
+    if not stat.S_ISREG(src_mode):
+        raise shutil.SpecialFileError(f"`{src}` is not a regular file")
+    with suppress(FileNotFoundError):
+        if stat.S_ISFIFO(os.stat(dst).st_mode):
+            raise shutil.SpecialFileError(f"`{dst}` is a named pipe")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        strategy = copy_data(fsrc, fdst, chunk_size, progress)
+    shutil.copystat(src, dst)
+    if progress is not None:
+        progress.add(files=1)
+    return strategy
+
+
+def same_device(src: PathLike[str] | str, dst: PathLike[str] | str) -> bool:
+    """Лежат ли src и место назначения dst (или его каталог, если dst еще нет) на одной файловой системе."""
+    target = dst if os.path.exists(dst) else os.path.dirname(os.path.abspath(dst))
+    return os.lstat(src).st_dev == os.stat(target).st_dev
+
+
+def scan_tree(
+        src: str,
+        dst: str,
+        directories: list[tuple[str, str]],
+        symlinks: bool = False,
+) -> Iterator[tuple[str, str]]:
+    """
+    Обход дерева через os.scandir: тип записи берется из самого scandir, без лишнего stat на каждый файл.
+    Каталоги назначения создаются сразу при обходе (и складываются в directories, чтобы потом выставить им метаданные),
+    а пары (файл источника, файл назначения) отдаются наружу для копирования.
+    Пути - обычные строки: на сотнях тысяч файлов создание Path на каждый заметно в профиле.
+    Ссылки, как и в copytree по умолчанию, разворачиваются: копируется то, на что они указывают.
+    С symlinks ссылки (и на каталоги тоже) отдаются как обычные записи, чтобы их можно было перенести как ссылки.
+    """
+    stack = [(src, dst)]
+    while stack:
+        src_dir, dst_dir = stack.pop()
+        os.makedirs(dst_dir, exist_ok=True)
+        directories.append((src_dir, dst_dir))
+
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=not symlinks):
+                    stack.append((entry.path, os.path.join(dst_dir, entry.name)))
+                else:
+                    yield entry.path, os.path.join(dst_dir, entry.name)
+
+
+def map_ordered[T](
+        function: Callable[[str, str], T],
+        pairs: Iterable[tuple[str, str]],
+        jobs: int = 1,
+) -> Iterator[T]:
+    """
+    function для каждой пары (источник, назначение) на пуле из jobs потоков, результаты в порядке пар.
+    В полете держим не больше jobs * COPY_TASKS_PER_WORKER задач, так что память не зависит от размера дерева.
+    На первой ошибке оставшиеся задачи отменяются, а ошибка пробрасывается как есть. При jobs == 1 пула нет вообще.
+    """
+    if jobs == 1:
+        for src_file, dst_file in pairs:
+            yield function(src_file, dst_file)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: deque[Future[T]] = deque()
+        try:
+            for src_file, dst_file in pairs:
+                pending.append(executor.submit(function, src_file, dst_file))
+                if len(pending) >= jobs * COPY_TASKS_PER_WORKER:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class CopyCheckpoint:
+    """
+    Журнал cp -r --resume: какие файлы уже скопированы полностью (вместе с правами и временем), какими были
+    размер и mtime источника в этот момент и какими получились размер и mtime назначения. Строка JSON на файл, только дозапись. Готовые файлы копятся пачками
+    по batch и дописываются одной записью, так что журнал почти ничего не стоит даже на миллионах мелких файлов.
+    Если процесс убили, теряется максимум последняя пачка - эти файлы просто сверятся по размеру и mtime.
+    Лежит рядом с каталогом назначения (.<имя>.cp-checkpoint), ведется только при --resume и удаляется после успешного копирования.
+    """
+
+    def __init__(self, dst: PathLike[str] | str, batch: int = COPY_CHECKPOINT_BATCH):
+        dst = os.path.abspath(dst)
+        self.path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.cp-checkpoint")
+        self.batch = batch
+        self.lock = threading.Lock()
+        self.pending: list[str] = []
+        self.file: IO[str] | None = None
+
+    def load(self) -> dict[str, tuple[int, int, int, int]]:
+        """
+        Файл назначения -> (размер, mtime_ns) источника и (размер, mtime_ns) назначения на момент копирования.
+        Недописанную строку пропускаем.
+        """
+        done: dict[str, tuple[int, int, int, int]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        path, *stats = json.loads(line)
+                        src_size, src_mtime_ns, dst_size, dst_mtime_ns = stats
+                    except (json.JSONDecodeError, ValueError):
+                        continue
+                    done[path] = (src_size, src_mtime_ns, dst_size, dst_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return done
+
+    def __enter__(self) -> Self:
+        """Журнал только дописываем: повторный --resume продолжает записи прерванного запуска."""
+        self.file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def record(self, dst_file: str, src_stat: os.stat_result, dst_stat: os.stat_result) -> None:
+        entry = [dst_file, src_stat.st_size, src_stat.st_mtime_ns, dst_stat.st_size, dst_stat.st_mtime_ns]
+        with self.lock:
+            self.pending.append(json.dumps(entry, ensure_ascii=False) + "\n")
+            if len(self.pending) >= self.batch:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self.pending and self.file is not None:
+            self.file.write("".join(self.pending))
+            self.file.flush()
+        self.pending = []
+
+    def close(self) -> None:
+        with self.lock:
+            self._flush()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def up_to_date(src_stat: os.stat_result, dst_file: str, recorded: tuple[int, int, int, int] | None = None) -> bool:
+    """
+    Можно ли не копировать файл заново. Сравниваем размер и mtime_ns назначения с источником:
+    copy_file переносит mtime, так что совпадение значит, что файл уже был скопирован целиком.
+    Журнал нужен там, где mtime переносится неточно (FAT, часть сетевых ФС): файл пропускается, если источник
+    не менялся с момента копирования, а назначение осталось таким, каким его записали. Назначение проверяем всегда:
+    файл, который после сбоя удалили или переписали, копируется заново.
+    """
+    try:
+        dst_stat = os.stat(dst_file)
+    except FileNotFoundError:
+        return False
+    current = (dst_stat.st_size, dst_stat.st_mtime_ns)
+    if recorded is not None and recorded == (src_stat.st_size, src_stat.st_mtime_ns, *current):
+        return True
+    return current == (src_stat.st_size, src_stat.st_mtime_ns)
+
+
+def copy_entry(
+        src_file: str,
+        dst_file: str,
+        chunk_size: int,
+        progress: Progress | None,
+        checkpoint: CopyCheckpoint | None,
+        done: dict[str, tuple[int, int, int, int]] | None,
+) -> str:
+    """Копирование одного файла дерева с отметкой в журнале. При resume (done не None) готовые файлы пропускаются."""
+    src_stat = os.stat(src_file)
+    if done is not None and up_to_date(src_stat, dst_file, done.get(dst_file)):
+        if progress is not None:
+            progress.add(src_stat.st_size, 1)
+        return "skipped"
+
+    strategy = copy_file(src_file, dst_file, chunk_size, progress)
+    if checkpoint is not None:
+        checkpoint.record(dst_file, src_stat, os.stat(dst_file))
+    return strategy
+
+
+def copy_tree(
+        src: PathLike[str] | str,
+        dst: PathLike[str] | str,
+        jobs: int = 1,
+        chunk_size: int = COPY_CHUNK_SIZE,
+        progress: Progress | None = None,
+        resume: bool = False,
+) -> Counter[str]:
+    """
+    Рекурсивное копирование каталога вместо shutil.copytree.
+    Файлы копируются через copy_file на пуле из jobs потоков: на деревьях из тысяч мелких файлов время уходит на системные вызовы
+    (open, stat, utime...), а не на данные, и потоки перекрывают эти ожидания друг другом (см. map_ordered).
+    Права и время каталогов выставляем в самом конце, когда в них уже ничего не пишется.
+    С resume готовые файлы отмечаются в журнале CopyCheckpoint, а уже скопированные (по журналу или по размеру и mtime)
+    пропускаются, так что повторный запуск после сбоя докопирует только остальное. Без resume журнала нет.
+    Возвращаем, сколько файлов каким способом скопировано (см. copy_data), пропущенные - как skipped.
+    """
+    directories: list[tuple[str, str]] = []
+    strategies: Counter[str] = Counter()
+    src, dst = os.fspath(src), os.fspath(dst)
+
+    checkpoint = CopyCheckpoint(dst) if resume else None
+    done = checkpoint.load() if checkpoint is not None else None
+    copy = partial(copy_entry, chunk_size=chunk_size, progress=progress, checkpoint=checkpoint, done=done)
+
+    with checkpoint if checkpoint is not None else nullcontext():
+        for strategy in map_ordered(copy, scan_tree(src, dst, directories), jobs):
+            strategies[strategy] += 1
+
+    for src_dir, dst_dir in reversed(directories):
+        shutil.copystat(src_dir, dst_dir)
+    if checkpoint is not None:
+        checkpoint.remove()
+    return strategies
+
+
+def move_file(src_file: str, dst_file: str, chunk_size: int = COPY_CHUNK_SIZE, progress: Progress | None = None) -> str:
+    """
+    Перенос одного файла между файловыми системами: копия через copy_file, проверка, что в назначении
+    лежит столько же байт, сколько было в источнике, и только потом удаление источника. Ссылка переносится как ссылка.
+    FIFO, устройства и сокеты не копируются (open() у FIFO без писателя заблокировался бы навсегда), а создаются заново
+    через os.mknod с тем же типом, правами и номером устройства. Устройство без root создать нельзя - тогда PermissionError.
+    """
+    src_stat = os.lstat(src_file)
+    if stat.S_ISLNK(src_stat.st_mode):
+        os.symlink(os.readlink(src_file), dst_file)
+        os.unlink(src_file)
+        if progress is not None:
+            progress.add(src_stat.st_size, 1)
+        return "symlink"
+    if not stat.S_ISREG(src_stat.st_mode):
+        os.mknod(dst_file, src_stat.st_mode, src_stat.st_rdev)
+        shutil.copystat(src_file, dst_file, follow_symlinks=False)
+        os.unlink(src_file)
+        if progress is not None:
+            progress.add(src_stat.st_size, 1)
+        return "special"
+
+    src_size = src_stat.st_size
+    strategy = copy_file(src_file, dst_file, chunk_size, progress)
+    dst_size = os.stat(dst_file).st_size
+    if dst_size != src_size:
+        raise OSError(errno.EIO, f"mv: '{dst_file}': скопировано {dst_size} байт из {src_size}, источник не удален")
+    os.unlink(src_file)
+    return strategy
+
+
+def move_tree(
+        src: PathLike[str] | str,
+        dst: PathLike[str] | str,
+        jobs: int = 1,
+        chunk_size: int = COPY_CHUNK_SIZE,
+        progress: Progress | None = None,
+) -> Counter[str]:
+    """
+    Перенос каталога между файловыми системами вместо copytree + rmtree у shutil.move.
+    Файлы переносятся через move_file на том же пуле потоков, что и у copy_tree, и каждый исходный файл удаляется,
+    как только проверена его копия. Одновременно в полете не больше jobs * COPY_TASKS_PER_WORKER файлов,
+    поэтому лишнее место на дисках ограничено ими, а не удваивается на все дерево.
+    Пустые каталоги источника удаляются в конце, после того как метаданные перенесены на каталоги назначения.
+    Если что-то упало, уже перенесенные файлы остаются в назначении, а остальные - в источнике: ничего не теряется.
+    """
+    directories: list[tuple[str, str]] = []
+    strategies: Counter[str] = Counter()
+    src, dst = os.fspath(src), os.fspath(dst)
+    move = partial(move_file, chunk_size=chunk_size, progress=progress)
+
+    for strategy in map_ordered(move, scan_tree(src, dst, directories, symlinks=True), jobs):
+        strategies[strategy] += 1
+
+    for src_dir, dst_dir in reversed(directories):
+        shutil.copystat(src_dir, dst_dir)
+        os.rmdir(src_dir)
+    return strategies
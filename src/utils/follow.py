@@ -0,0 +1,156 @@
+import codecs
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from os import PathLike
+from typing import IO
+
+from src.enums.constants import CAT_CHUNK_SIZE, FOLLOW_POLL_INTERVAL
+from src.utils.copy import kernel_copy_allowed
+
+# Маски событий из sys/inotify.h: изменения самого файла и появление нового файла с тем же именем в каталоге
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+FILE_EVENTS = IN_MODIFY | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+DIRECTORY_EVENTS = IN_CREATE | IN_MOVED_TO
+
+
+class Inotify:
+    """
+    Минимальная обертка над inotify через ctypes. События не разбираем: любое событие только будит follow_file,
+    а что именно случилось (дописали, обрезали, подменили), он выясняет сам через stat.
+    """
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.watches: list[int] = []
+
+    @classmethod
+    def open(cls) -> "Inotify | None":
+        """Inotify есть только на Linux, и его может не быть (нет libc с inotify, исчерпан лимит): тогда None и опрос по таймеру."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError):
+            return None
+
+    def add(self, path: PathLike[str] | str, mask: int) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), os.fspath(path))
+        self.watches.append(wd)
+
+    def watch(self, path: PathLike[str] | str) -> None:
+        """Следим за самим файлом и за его каталогом: так видно и дозапись, и ротацию (файл заменили новым)."""
+        for wd in self.watches:
+            self.libc.inotify_rm_watch(self.fd, wd)
+        self.watches.clear()
+        self.add(path, FILE_EVENTS)
+        self.add(os.path.dirname(os.path.abspath(path)), DIRECTORY_EVENTS)
+
+    def wait(self, timeout: float | None) -> None:
+        """Ждем события без опроса (процесс спит в select), потом вычитываем очередь событий целиком."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def drain(f: IO[bytes], out: IO[bytes], decoder: codecs.IncrementalDecoder | None, chunk_size: int = CAT_CHUNK_SIZE) -> int:
+    """Вывод всего, что дописано в файл с текущей позиции до конца. Сбрасываем out сразу, чтобы новые строки были видны."""
+    written = 0
+    while chunk := f.read(chunk_size):
+        if decoder is not None:
+            decoder.decode(chunk)
+        out.write(chunk)
+        written += len(chunk)
+    if written:
+        out.flush()
+    return written
+
+
+def follow_file(
+        path: PathLike[str] | str,
+        f: IO[bytes],
+        out: IO[bytes],
+        text: bool = False,
+        stop: threading.Event | None = None,
+        poll_interval: float = FOLLOW_POLL_INTERVAL,
+) -> int:
+    """
+    Режим tail -f: выводим в out все, что дописывается в открытый файл f начиная с его текущей позиции.
+    Между дозаписями процесс спит в inotify (новые данные видны через миллисекунды, без нагрузки на процессор),
+    а если inotify недоступен - проверяет файл раз в poll_interval секунд.
+    Файл обрезали (размер меньше позиции) - читаем заново с начала. Ротация (по пути теперь другой файл) -
+    дочитываем старый файл и переходим на новый. Работает, пока не выставлен stop (или до Ctrl+C). Возвращает, сколько байт выведено.
+    """
+    watcher = Inotify.open() if kernel_copy_allowed(f) else None
+    decoder = codecs.getincrementaldecoder("utf-8")() if text else None
+    current = f
+    written = 0
+    with ExitStack() as rotated:
+        try:
+            if watcher is not None:
+                try:
+                    watcher.watch(path)
+                except OSError:
+                    watcher.close()
+                    watcher = None
+
+            while stop is None or not stop.is_set():
+                written += drain(current, out, decoder)
+
+                try:
+                    path_stat = os.stat(path)
+                except FileNotFoundError:
+                    path_stat = None
+                file_stat = os.fstat(current.fileno())
+
+                if path_stat is not None and (path_stat.st_dev, path_stat.st_ino) != (file_stat.st_dev, file_stat.st_ino):
+                    written += drain(current, out, decoder)
+                    # Старый файл дочитан, f закрывает вызывающий, а открытые здесь после ротации - мы
+                    rotated.close()
+                    current = rotated.enter_context(open(path, "rb"))
+                    if decoder is not None:
+                        decoder.reset()
+                    if watcher is not None:
+                        watcher.watch(path)
+                    continue
+                if file_stat.st_size < current.tell():
+                    current.seek(0)
+                    if decoder is not None:
+                        decoder.reset()
+                    continue
+
+                if watcher is not None:
+                    # Без stop ждать нечего, кроме событий: спим до первого из них
+                    watcher.wait(None if stop is None else poll_interval)
+                elif stop is not None:
+                    stop.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+        finally:
+            if watcher is not None:
+                watcher.close()
+    return written
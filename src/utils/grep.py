@@ -0,0 +1,345 @@
+import io
+import mmap
+import os
+import re
+from collections import deque
+from collections.abc import Callable, Generator, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from os import PathLike
+from pathlib import Path
+from typing import IO
+
+from src.enums.constants import (
+    BINARY,
+    GREP_BATCH_SIZE,
+    GREP_CHUNK_SIZE,
+    GREP_MMAP_THRESHOLD,
+    GREP_SNIFF_SIZE,
+    GREP_TASKS_PER_WORKER,
+    REGEX_SPECIAL,
+)
+
+
+class LiteralPattern:
+    """
+    Фиксированная строка вместо регулярки: для grep -F и для паттернов без спецсимволов.
+    Повторяет нужный кусок интерфейса re.Pattern (pattern и search), чтобы построчный поиск работал с ним так же.
+    В файле же ищется не построчно, а needle по всему буферу через bytes.find/mmap.find.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.needle = pattern.encode("utf-8")
+
+    def search(self, string: str) -> bool:
+        return self.pattern in string
+
+
+def compile_pattern(pattern: str, ignore: bool, fixed: bool) -> re.Pattern | LiteralPattern:
+    """
+    Выбираем, чем искать. Без -i строка без спецсимволов регулярок (или любая строка с -F) ищется как литерал.
+    С -i литерал экранируем и отдаем регулярке: искать без учета регистра через find не получится.
+    """
+    # \r, как и \n, в строке файла не встречается (это конец строки), так что такие паттерны литералом не ищем
+    if "\n" not in pattern and "\r" not in pattern and not ignore and (fixed or not REGEX_SPECIAL.intersection(pattern)):
+        return LiteralPattern(pattern)
+    if fixed:
+        pattern = re.escape(pattern)
+    return re.compile(pattern, re.IGNORECASE if ignore else 0)
+
+
+@lru_cache(maxsize=32)
+def multiline_pattern(pattern: re.Pattern) -> re.Pattern | None:
+    """
+    Версия паттерна для поиска сразу по большому куску текста, а не по строке: ^ и $ должны срабатывать на границах строк.
+    \\A и \\Z в куске означают совсем другое, чем в строке, поэтому для таких паттернов None - ищем построчно.
+    """
+    if r"\A" in pattern.pattern or r"\Z" in pattern.pattern:
+        return None
+    return re.compile(pattern.pattern, pattern.flags | re.MULTILINE)
+
+
+@lru_cache(maxsize=32)
+def bytes_pattern(pattern: re.Pattern) -> re.Pattern | None:
+    """Байтовая версия паттерна для бинарников. Если паттерн в байты не переводится - None, ищем по декодированному тексту."""
+    try:
+        return re.compile(pattern.pattern.encode("utf-8"), (pattern.flags & ~re.UNICODE) | re.MULTILINE)
+    except (re.error, ValueError):
+        return None
+
+
+def grep_lines(
+        pattern: re.Pattern | LiteralPattern,
+        lines: IO[str],
+        shown_path: PathLike[str] | str,
+        first_line: int = 1,
+) -> Iterator[str]:
+    """Проходимся по строкам, индексируя их, и отдаем строки с совпадениями по регулярке."""
+    for i, string in enumerate(lines, first_line):
+        if pattern.search(string):
+            yield f"{shown_path}:{i}:{string}"
+
+
+def grep_chunk(pattern: re.Pattern, chunk: str, first_line: int, shown_path: PathLike[str] | str) -> Iterator[str]:
+    """
+    Поиск по куску текста из целых строк.
+    Регулярка (multiline-версия) гоняется по всему куску сразу, а на строки разбираем только места совпадений.
+    Совпадение может захватить несколько строк (\\s, [^x]...), поэтому строку, где оно началось, перепроверяем исходным паттерном.
+    """
+    chunk_pattern = multiline_pattern(pattern)
+    if chunk_pattern is None:
+        yield from grep_lines(pattern, io.StringIO(chunk, newline=None), shown_path, first_line)
+        return
+
+    pos = 0
+    counted = 0
+    line_number = first_line
+
+    while (match := chunk_pattern.search(chunk, pos)) is not None:
+        # После последнего \n строки уже нет, хотя MULTILINE-паттерн (^$, ^\s*$) находит там пустое совпадение
+        if match.start() == len(chunk) and chunk.endswith("\n"):
+            return
+        start = chunk.rfind("\n", 0, match.start()) + 1
+        end = chunk.find("\n", match.start())
+        end = len(chunk) if end == -1 else end + 1
+
+        line_number += chunk.count("\n", counted, start)
+        counted = start
+
+        string = chunk[start:end]
+        if pattern.search(string):
+            yield f"{shown_path}:{line_number}:{string}"
+
+        if end >= len(chunk):
+            return
+        pos = end
+
+
+def grep_buffer(pattern: re.Pattern, buffer: bytes | mmap.mmap, shown_path: PathLike[str] | str) -> Iterator[str]:
+    """
+    Поиск регуляркой по содержимому файла (bytes или mmap).
+    Буфер режем на куски примерно по GREP_CHUNK_SIZE, граница куска всегда по переводу строки.
+    Декодируется за раз только один кусок, так что память не зависит от размера файла.
+    \\r\\n и одиночный \\r сводим к \\n, как это делает обычное чтение в текстовом режиме. Кусок кончается на \\n,
+    поэтому \\r\\n между кусками не разрывается.
+    """
+    size = len(buffer)
+    start = 0
+    line_number = 1
+
+    while start < size:
+        end = buffer.find(b"\n", min(start + GREP_CHUNK_SIZE, size))
+        end = size if end == -1 else end + 1
+
+        chunk = buffer[start:end].decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+        yield from grep_chunk(pattern, chunk, line_number, shown_path)
+
+        line_number += chunk.count("\n")
+        start = end
+
+
+def count_bytes(buffer: bytes | mmap.mmap, needle: bytes, start: int, end: int) -> int:
+    """
+    Количество needle в buffer[start:end]. У mmap нет count, поэтому считаем по кускам; куски перекрываются
+    на len(needle) - 1 байт, чтобы не потерять вхождение на стыке, и каждое вхождение считается в куске, где оно начинается.
+    """
+    if isinstance(buffer, bytes):
+        return buffer.count(needle, start, end)
+    overlap = len(needle) - 1
+    return sum(buffer[i:min(i + GREP_CHUNK_SIZE + overlap, end)].count(needle) for i in range(start, end, GREP_CHUNK_SIZE))
+
+
+def count_lines(buffer: bytes | mmap.mmap, start: int, end: int) -> int:
+    """Количество переводов строки в buffer[start:end]."""
+    return count_bytes(buffer, b"\n", start, end)
+
+
+def has_lone_cr(buffer: bytes | mmap.mmap, start: int, end: int) -> bool:
+    """Есть ли в buffer[start:end] \\r не в паре \\r\\n (такой \\r при обычном чтении тоже конец строки)."""
+    cr = count_bytes(buffer, b"\r", start, end)
+    return cr > 0 and cr != count_bytes(buffer, b"\r\n", start, end)
+
+
+def grep_literal(
+        pattern: LiteralPattern,
+        buffer: bytes | mmap.mmap,
+        shown_path: PathLike[str] | str,
+) -> Generator[str, None, tuple[int, int] | None]:
+    """
+    Быстрый путь для литералов: ищем needle по всему буферу через find (это C-код, без регулярок и без цикла по строкам).
+    Границы строки и ее номер вычисляем только вокруг найденных мест. \\r\\n в конце строки выводим как \\n.
+    Одиночный \\r делит строки иначе, чем \\n, поэтому, встретив его перед очередным совпадением (проверяем только
+    то, что и так просматриваем ради номера строки), останавливаемся и возвращаем (смещение, номер строки),
+    с которых grep_file дочитает файл построчно. Все выведенное до этого места от \\r не зависит.
+    """
+    size = len(buffer)
+    pos = 0
+    counted = 0
+    line_number = 1
+
+    while pos < size and (hit := buffer.find(pattern.needle, pos)) != -1:
+        start = buffer.rfind(b"\n", 0, hit) + 1
+        end = buffer.find(b"\n", hit)
+        end = size if end == -1 else end + 1
+
+        if has_lone_cr(buffer, counted, end):
+            return counted, line_number
+        line_number += count_lines(buffer, counted, start)
+
+        string = buffer[start:end].decode("utf-8", errors="ignore")
+        if string.endswith("\r\n"):
+            string = string[:-2] + "\n"
+        yield f"{shown_path}:{line_number}:{string}"
+        # Дальше считаем и проверяем с начала следующей строки
+        line_number += 1
+        counted = pos = end
+    return None
+
+
+def buffer_matches(pattern: re.Pattern | LiteralPattern, buffer: bytes | mmap.mmap) -> bool:
+    """
+    Вердикт для бинарного файла: есть совпадение или нет. Строки не нужны, поэтому ищем по сырым байтам:
+    литерал через find, регулярку - ее байтовой версией. Если байтовой версии нет - по декодированному тексту.
+    """
+    if isinstance(pattern, LiteralPattern):
+        return buffer.find(pattern.needle) != -1
+
+    raw_pattern = bytes_pattern(pattern)
+    if raw_pattern is not None:
+        return raw_pattern.search(buffer) is not None
+    return any(grep_buffer(pattern, buffer, ""))
+
+
+def grep_text_lines(
+        pattern: re.Pattern | LiteralPattern,
+        f: IO[bytes],
+        shown_path: PathLike[str] | str,
+        offset: int = 0,
+        first_line: int = 1,
+) -> Iterator[str]:
+    """
+    Построчный поиск с universal newlines, как в исходной версии grep: \\r\\n и одиночный \\r тоже конец строки.
+    Начинаем с offset (начало строки first_line): сюда grep_literal передает файл, встретив одиночный \\r.
+    """
+    f.seek(offset)
+    lines = io.TextIOWrapper(f, encoding="utf-8", errors="ignore", newline=None)
+    try:
+        yield from grep_lines(pattern, lines, shown_path, first_line)
+    finally:
+        lines.detach()
+
+
+@contextmanager
+def file_buffer(f: IO[bytes], head: bytes, size: int) -> Iterator[bytes | mmap.mmap]:
+    """
+    Все содержимое файла одним буфером. Маленький файл уже целиком в head.
+    Большой (от GREP_MMAP_THRESHOLD) отображаем через mmap, остальное дочитываем в память - это не больше порога.
+    """
+    if size <= len(head):
+        yield head
+        return
+
+    if size >= GREP_MMAP_THRESHOLD:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mm = None
+        if mm is not None:
+            with mm:
+                yield mm
+            return
+
+    yield head + f.read()
+
+
+def grep_file(pattern: re.Pattern | LiteralPattern, file_path: Path, shown_path: PathLike[str] | str) -> Iterator[str]:
+    """
+    Поиск по одному файлу. Сначала читаем первый блок и смотрим, есть ли там NUL - тогда файл двоичный
+    (расширения из BINARY тоже считаем двоичными). Для двоичного выводим только вердикт, и только если совпадение реально есть.
+    Текст ищем по буферу целиком: литерал через find, регулярку - крупными кусками.
+    Если литерал наткнулся на одиночный \\r, остаток файла ищем построчно через grep_text_lines.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(GREP_SNIFF_SIZE)
+        size = os.fstat(f.fileno()).st_size
+        binary = b"\0" in head or file_path.suffix in BINARY
+
+        with file_buffer(f, head, size) as buffer:
+            if binary:
+                if buffer_matches(pattern, buffer):
+                    yield f"grep: {shown_path}: двоичный файл совпадает\n"
+            elif isinstance(pattern, LiteralPattern):
+                resume = yield from grep_literal(pattern, buffer, shown_path)
+                if resume is not None:
+                    yield from grep_text_lines(pattern, f, shown_path, *resume)
+            else:
+                yield from grep_buffer(pattern, buffer, shown_path)
+
+
+def grep_tree_file(pattern: re.Pattern | LiteralPattern, file_path: Path, relative_path: Path) -> Iterator[str]:
+    """Обработка одного файла при рекурсивном поиске. Если файл не читается - молча пропускаем."""
+    try:
+        yield from grep_file(pattern, file_path, relative_path)
+    except OSError:
+        return
+
+
+def walk_files(path: Path, keep: Callable[[Path, Path], bool] | None = None) -> Iterator[Path]:
+    """
+    Рекурсивный обход каталога через os.walk. Отдаем пути файлов в том же порядке, что и последовательный grep.
+    keep - фильтр от триграммного индекса: файлы, в которых совпадения точно нет, даже не открываем.
+    """
+    for dirpath, _, filenames in os.walk(path):
+        for file in filenames:
+            file_path = Path(dirpath) / file
+            if keep is None or keep(file_path, file_path.relative_to(path)):
+                yield file_path
+
+
+def grep_batch(pattern: re.Pattern | LiteralPattern, root: Path, files: list[Path]) -> list[str]:
+    """
+    Задача для воркера из пула процессов: прогоняем пачку файлов и возвращаем все найденные строки.
+    Файлы шлются пачками, а не по одному, чтобы не платить за пересылку между процессами на каждом мелком файле.
+    """
+    result: list[str] = []
+    for file_path in files:
+        result.extend(grep_tree_file(pattern, file_path, file_path.relative_to(root)))
+    return result
+
+
+def parallel_grep(
+        pattern: re.Pattern | LiteralPattern,
+        root: Path,
+        jobs: int,
+        keep: Callable[[Path, Path], bool] | None = None,
+) -> Iterator[str]:
+    """
+    Параллельный рекурсивный grep на ProcessPoolExecutor.
+    Обход дерева идет в главном процессе, файлы пачками раздаются воркерам.
+    Результаты забираем строго в порядке отправки (очередь futures), поэтому вывод совпадает с последовательным.
+    В полете держим не больше jobs * GREP_TASKS_PER_WORKER пачек, так что память не растет вместе с деревом,
+    а при раннем выходе (-m) лишние задачи просто отменяются.
+    """
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    pending: deque[Future[list[str]]] = deque()
+    batch: list[Path] = []
+
+    try:
+        for file_path in walk_files(root, keep):
+            batch.append(file_path)
+            if len(batch) < GREP_BATCH_SIZE:
+                continue
+
+            pending.append(executor.submit(grep_batch, pattern, root, batch))
+            batch = []
+            if len(pending) >= jobs * GREP_TASKS_PER_WORKER:
+                yield from pending.popleft().result()
+
+        if batch:
+            pending.append(executor.submit(grep_batch, pattern, root, batch))
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,157 @@
+import gzip
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable, Iterator
+from io import BufferedIOBase
+from pathlib import Path
+
+
+def open_segment(path: Path) -> BufferedIOBase:
+    """Старый сегмент истории на чтение: сжатые gzip лежат с расширением .gz."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+class HistoryIndex:
+    """
+    Индекс в памяти для поиска по .history.
+    Все команды лежат одной строкой text через перевод строки (компактно и можно искать по всем сразу через find/регулярку),
+    offsets[k] - начало k-й команды в text, ids[k] - ее номер в истории.
+    names - имя команды (первое слово: cp, rm...) -> номера записей, где оно встречается.
+    .history только дописывается, поэтому при обновлении читаем лишь то, что появилось с прошлого раза.
+    Старые сегменты после ротации не меняются - их читаем один раз, при (пере)построении индекса.
+    """
+
+    def __init__(self, history_file: Path, segments: Callable[[], list[Path]] = list):
+        self.history_file = history_file
+        self.segments = segments
+        self._reset()
+
+    def _reset(self) -> None:
+        self.inode: int | None = None
+        self.read_size = 0
+        self.text = ""
+        self.offsets = array("Q")
+        self.ids = array("Q")
+        self.names: dict[str, array] = {}
+
+    def refresh(self) -> None:
+        """
+        Дочитываем новые строки .history. Если файл подменили (ротация) или он стал меньше - строим индекс заново,
+        начиная со старых сегментов.
+        """
+        file_stat = os.stat(self.history_file)
+        if self.inode is not None and (file_stat.st_ino != self.inode or file_stat.st_size < self.read_size):
+            self._reset()
+
+        if self.inode is None:
+            self.inode = file_stat.st_ino
+            for segment in self.segments():
+                with open_segment(segment) as f:
+                    self._append(f.read())
+
+        if file_stat.st_size == self.read_size:
+            return
+
+        with open(self.history_file, "rb") as f:
+            f.seek(self.read_size)
+            data = f.read(file_stat.st_size - self.read_size)
+
+        # Недописанную последнюю строку оставляем на следующий раз
+        complete = data.rfind(b"\n") + 1
+        self.read_size += complete
+        self._append(data[:complete])
+
+    def _append(self, data: bytes) -> None:
+        """Разбираем целые строки истории и дописываем их в индекс."""
+        parts: list[str] = []
+        position = len(self.text) + 1 if self.text else 0
+        for line in data.decode("utf-8", errors="replace").split("\n"):
+            line = line.rstrip("\r")
+            if not line:
+                continue
+            number, _, command = line.partition(" ")
+            if not number.isdigit():
+                number, command = str(len(self.ids) + 1), line
+
+            entry = len(self.ids)
+            self.offsets.append(position)
+            self.ids.append(int(number))
+            name = command.split(maxsplit=1)[0] if command.strip() else ""
+            self.names.setdefault(name, array("Q")).append(entry)
+
+            parts.append(command)
+            position += len(command) + 1
+
+        if parts:
+            self.text = "\n".join([self.text, *parts]) if self.text else "\n".join(parts)
+
+    def command(self, entry: int) -> str:
+        """Текст записи entry, вырезается из общей строки по смещениям."""
+        end = self.offsets[entry + 1] - 1 if entry + 1 < len(self.offsets) else len(self.text)
+        return self.text[self.offsets[entry]:end]
+
+    def _entry_at(self, position: int) -> int:
+        return bisect_right(self.offsets, position) - 1
+
+    def _substring_entries(self, query: str) -> Iterator[int]:
+        """Записи, содержащие подстроку, от новых к старым: rfind по всему тексту, без перебора записей."""
+        end = len(self.text)
+        while (position := self.text.rfind(query, 0, end)) != -1:
+            entry = self._entry_at(position)
+            yield entry
+            if entry == 0:
+                return
+            end = self.offsets[entry] - 1
+
+    def _regex_entries(self, pattern: re.Pattern) -> Iterator[int]:
+        """
+        Записи, подходящие под регулярку, от новых к старым. Регулярка гоняется по всему тексту сразу,
+        а запись, где началось совпадение, перепроверяем отдельно: совпадение могло зацепить соседнюю через перевод строки.
+        """
+        entries: list[int] = []
+        position = 0
+        while position <= len(self.text) and (match := pattern.search(self.text, position)) is not None:
+            entry = self._entry_at(match.start())
+            if pattern.search(self.command(entry)):
+                entries.append(entry)
+            position = self.offsets[entry + 1] if entry + 1 < len(self.offsets) else len(self.text) + 1
+        return reversed(entries)
+
+    def search(
+            self,
+            query: str | None = None,
+            name: str | None = None,
+            regex: bool = False,
+            unique: bool = False,
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Поиск по истории: (номер, команда) от новых к старым.
+        query - подстрока или регулярка (regex), name - имя команды. unique оставляет только самый свежий вызов каждой команды.
+        Если задано имя, перебираем только записи этой команды из names, иначе ищем query сразу по всему тексту.
+        """
+        self.refresh()
+        pattern = re.compile(query, re.MULTILINE) if regex and query is not None else None
+
+        if name is not None:
+            entries = reversed(self.names.get(name, array("Q")))
+        elif pattern is not None:
+            entries = self._regex_entries(pattern)
+        elif query:
+            entries = self._substring_entries(query)
+        else:
+            entries = reversed(range(len(self.ids)))
+
+        seen: set[str] = set()
+        for entry in entries:
+            command = self.command(entry)
+            if name is not None and query is not None and not (pattern.search(command) if pattern is not None else query in command):
+                continue
+            if unique:
+                if command in seen:
+                    continue
+                seen.add(command)
+            yield self.ids[entry], command
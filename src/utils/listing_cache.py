@@ -0,0 +1,72 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from os import PathLike
+
+from src.enums.constants import LS_CACHE_RACY_NS, LS_CACHE_SIZE
+
+
+@dataclass
+class Listing:
+    # (st_dev, st_ino, st_mtime_ns) каталога в момент чтения: любое создание, удаление или переименование внутри меняет mtime
+    signature: tuple[int, int, int]
+    names: list[str]
+    # Готовый вывод ls без -l: он зависит только от имен, поэтому его можно хранить целиком
+    lines: list[str] | None = None
+
+
+def signature(directory_stat: os.stat_result) -> tuple[int, int, int]:
+    return directory_stat.st_dev, directory_stat.st_ino, directory_stat.st_mtime_ns
+
+
+class ListingCache:
+    """
+    LRU-кэш листингов каталогов для ls в интерактивной консоли: ключ - (абсолютный путь, флаг -a),
+    значение - отсортированные имена и готовый вывод. Запись верна, пока у каталога те же устройство, inode и mtime,
+    так что повторный ls неизменного каталога стоит одного stat.
+    Каталог, измененный меньше LS_CACHE_RACY_NS назад, не кэшируем (как git с "racy" файлами): mtime у файловой системы
+    грубее наносекунд, и изменение в тот же тик, что и чтение, не поменяло бы подпись.
+    """
+
+    def __init__(self, maxsize: int = LS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[tuple[str, bool], Listing] = OrderedDict()
+
+    @staticmethod
+    def key(path: PathLike[str] | str, hidden: bool) -> tuple[str, bool]:
+        return os.path.abspath(path), hidden
+
+    def get(self, path: PathLike[str] | str, hidden: bool, directory_stat: os.stat_result) -> Listing | None:
+        key = self.key(path, hidden)
+        listing = self.entries.get(key)
+        if listing is None:
+            return None
+        if listing.signature != signature(directory_stat):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return listing
+
+    def put(self, path: PathLike[str] | str, hidden: bool, directory_stat: os.stat_result, listing: Listing) -> None:
+        if self.maxsize <= 0 or time.time_ns() - directory_stat.st_mtime_ns < LS_CACHE_RACY_NS:
+            return
+        key = self.key(path, hidden)
+        self.entries[key] = listing
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, *paths: PathLike[str] | str) -> None:
+        """
+        Сброс листингов, которые могла изменить операция над paths: самих путей, всего, что под ними,
+        и их родительских каталогов. Зовется из cp/mv/rm сервиса, не дожидаясь проверки по mtime.
+        """
+        targets = [os.path.abspath(path) for path in paths]
+        affected = set(targets) | {os.path.dirname(path) for path in targets}
+        prefixes = tuple(os.path.join(path, "") for path in targets)
+        for key in [key for key in self.entries if key[0] in affected or key[0].startswith(prefixes)]:
+            del self.entries[key]
+
+    def clear(self) -> None:
+        self.entries.clear()
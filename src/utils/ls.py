@@ -1,5 +1,9 @@
+import heapq
+from collections.abc import Iterable, Iterator
 from datetime import datetime
+from functools import cache, lru_cache
 import os
+from operator import attrgetter
 from os import PathLike
 import stat
 
@@ -25,21 +29,81 @@ def default_ls(items: list[str]) -> list[str]:
     return strings
 
 
-def detailed_ls(path: PathLike[str] | str, items: list[str]) -> list[str]:
+@cache
+def format_mode(mode: int) -> str:
+    """Права в виде drwxr-xr-x. Разных st_mode в каталоге единицы, так что на 100к файлов это единицы вызовов filemode."""
+    return stat.filemode(mode)
+
+
+@lru_cache(maxsize=4096)
+def format_minute(minute: int) -> str:
+    """
+    Время изменения в формате ls. Выводим с точностью до минуты, поэтому кэшируем по номеру минуты:
+    файлы, созданные пачкой (распаковка, cp -r), делят одну строку, и strftime зовется один раз на минуту, а не на файл.
+    """
+    return datetime.fromtimestamp(minute * 60).strftime("%b %d %H:%M")
+
+
+def entry_stat(entry: os.DirEntry) -> os.stat_result:
+    """stat записи, как у os.stat (по ссылке). Битая ссылка не роняет весь вывод: для нее берем stat самой ссылки."""
+    try:
+        return entry.stat()
+    except FileNotFoundError:
+        return entry.stat(follow_symlinks=False)
+
+
+def path_stat(path: str) -> os.stat_result:
+    """То же, что entry_stat, но по пути - для имен из кэша листингов."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return os.lstat(path)
+
+
+def detailed_line(name: str, item_stat: os.stat_result) -> str:
+    return f"{format_mode(item_stat.st_mode)} {item_stat.st_size:>8} {format_minute(int(item_stat.st_mtime // 60))} {name} \n"
+
+
+def detailed_ls(entries: Iterable[os.DirEntry]) -> list[str]:
     """
     Выполняем вывод ls с флагом -l:
-    Перебираем каждый файл.
+    Перебираем записи, полученные одним проходом os.scandir в LinuxConsoleService.ls: путь заново не собираем и не разбираем,
+    stat берем у самой записи. Права и время форматируем через кэши format_mode/format_minute.
     Формируем строку по заданным требованиям в лабе(права-размер-дата-имя), ничего сверхъестественного.
     """
-    strings: list[str] = []
-    for filename in items:
-        item_path = os.path.join(path, filename)
-        item_stat = os.stat(item_path)
+    return [detailed_line(entry.name, entry_stat(entry)) for entry in entries]
 
-        permissions = stat.filemode(item_stat.st_mode)
-        size = item_stat.st_size
-        time = datetime.fromtimestamp(item_stat.st_mtime).strftime("%b %d %H:%M")
 
-        strings.append(f"{permissions} {size:>8} {time} {filename} \n")
+def detailed_ls_names(path: PathLike[str] | str, names: Iterable[str]) -> list[str]:
+    """
+    Вывод ls -l по уже известным именам (из кэша листингов). Имена в каталоге с тем же mtime не меняются,
+    а размер и время самих файлов - могут, поэтому stat каждого файла берем заново.
+    """
+    return [detailed_line(name, path_stat(os.path.join(path, name))) for name in names]
 
-    return strings
+
+def scan_entries(path: PathLike[str] | str, hidden: bool) -> Iterator[os.DirEntry]:
+    """Записи каталога в том порядке, в каком их отдает os.scandir (без сортировки), скрытые - только с hidden."""
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            if hidden or not entry.name.startswith("."):
+                yield entry
+
+
+def stream_ls(entries: Iterable[os.DirEntry], detailed: bool) -> Iterator[str]:
+    """
+    Потоковый вывод для ls -U: строка отдается сразу, как scandir вернул запись. Без -l - по имени на строку:
+    колонки default_ls требуют знать самое длинное имя, то есть сначала прочитать весь каталог.
+    """
+    for entry in entries:
+        yield detailed_line(entry.name, entry_stat(entry)) if detailed else f"{entry.name}\n"
+
+
+def page_entries(entries: Iterable[os.DirEntry], offset: int, limit: int | None) -> list[os.DirEntry]:
+    """
+    Страница отсортированного по имени листинга: записи с offset по offset + limit.
+    С limit через heapq.nsmallest: в куче держится не больше offset + limit записей, а не весь каталог.
+    """
+    if limit is None:
+        return sorted(entries, key=attrgetter("name"))[offset:]
+    return heapq.nsmallest(offset + limit, entries, key=attrgetter("name"))[offset:]
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+from os import PathLike
+
+from src.enums.constants import PROGRESS_INTERVAL
+
+
+def format_size(size: float) -> str:
+    """Размер в человекочитаемом виде: 512 B, 1.5 KiB, 20.0 MiB..."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def tree_totals(path: PathLike[str] | str) -> tuple[int, int]:
+    """Сколько байт и файлов в дереве (для ETA). Только метаданные через scandir, содержимое не читается."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size, 1
+
+    total_bytes = total_files = 0
+    stack = [os.fspath(path)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total_bytes += entry.stat(follow_symlinks=False).st_size
+                    total_files += 1
+    return total_bytes, total_files
+
+
+class Progress:
+    """
+    Общий счетчик прогресса для долгих cp/mv/rm/zip/tar: сколько байт и файлов готово, скорость, сколько осталось.
+    Операции сообщают о прогрессе кусками (файл целиком или кусок копирования), а не по байту, под блокировкой -
+    копирование идет из нескольких потоков. Строка прогресса перерисовывается не чаще раза в PROGRESS_INTERVAL секунд,
+    так что на тысячах мелких файлов вывод почти ничего не стоит.
+    render - куда выводить строку (в интерактивной консоли это stderr), None - только считать, для итога в лог.
+    """
+
+    def __init__(self, operation: str, render: Callable[[str], object] | None = None, interval: float = PROGRESS_INTERVAL):
+        self.operation = operation
+        self.render = render
+        self.interval = interval
+        self.lock = threading.Lock()
+
+        self.bytes = 0
+        self.files = 0
+        self.total_bytes: int | None = None
+        self.total_files: int | None = None
+        self.started = time.monotonic()
+        self.rendered = self.started
+        self.shown = False
+
+    def expect(self, total_bytes: int, total_files: int | None = None) -> None:
+        """Сколько всего предстоит сделать: без этого выводятся только счетчики и скорость, без процентов и ETA."""
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+
+    def expect_tree(self, path: PathLike[str] | str) -> None:
+        """
+        Объем работы по дереву. Обход стоит лишний проход по метаданным, поэтому делаем его,
+        только если строку прогресса действительно кто-то видит.
+        """
+        if self.render is not None:
+            self.expect(*tree_totals(path))
+
+    def add(self, size: int = 0, files: int = 0) -> None:
+        with self.lock:
+            self.bytes += size
+            self.files += files
+            if self.render is None:
+                return
+            now = time.monotonic()
+            if now - self.rendered < self.interval:
+                return
+            self.rendered = now
+            self.shown = True
+            self.render(f"\r{self.line(now)}\x1b[K")
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def line(self, now: float | None = None) -> str:
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.bytes / elapsed if elapsed > 0 else 0.0
+
+        done = format_size(self.bytes)
+        if self.total_bytes:
+            done += f" / {format_size(self.total_bytes)} ({self.bytes * 100 // self.total_bytes}%)"
+        files = f"{self.files}" + (f"/{self.total_files}" if self.total_files else "")
+
+        line = f"{self.operation}: {done}, файлов {files}, {format_size(rate)}/s"
+        if self.total_bytes and rate > 0:
+            line += f", осталось {format_duration(max(self.total_bytes - self.bytes, 0) / rate)}"
+        return line
+
+    def finish(self) -> str:
+        """Итог операции для лога: объем, время и средняя скорость. Строку прогресса заканчиваем переводом строки."""
+        elapsed = self.elapsed
+        if self.render is not None and self.shown:
+            self.render(f"\r{self.line()}\x1b[K\n")
+
+        rate = self.bytes / elapsed if elapsed > 0 else 0.0
+        return (
+            f"{self.operation}: {self.files} файлов, {format_size(self.bytes)} за {elapsed:.2f} с "
+            f"({format_size(rate)}/s, {self.files / elapsed if elapsed > 0 else 0:.0f} файлов/s)"
+        )
@@ -0,0 +1,107 @@
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from os import PathLike
+
+from src.utils.progress import Progress
+
+# Каталог открываем только как каталог и не идем по ссылке, если его успели подменить ссылкой
+DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+
+def fd_functions_supported() -> bool:
+    return os.open in os.supports_dir_fd and os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
+
+
+def clear_directory(directory: str, progress: Progress | None = None) -> list[str]:
+    """
+    Удаление всех файлов и ссылок в одном каталоге. Каталог открывается один раз, а файлы удаляются относительно его
+    дескриптора (unlink с dir_fd), так что ядро не разбирает полный путь заново на каждый файл.
+    Подкаталоги не трогаем, а возвращаем - их раздаст remove_tree.
+    """
+    subdirectories: list[str] = []
+    if not fd_functions_supported():
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                    continue
+                size = entry.stat(follow_symlinks=False).st_size if progress is not None else 0
+                os.unlink(entry.path)
+                if progress is not None:
+                    progress.add(size, 1)
+        return subdirectories
+
+    fd = os.open(directory, DIR_FLAGS)
+    try:
+        with os.scandir(fd) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(os.path.join(directory, entry.name))
+                    continue
+                size = entry.stat(follow_symlinks=False).st_size if progress is not None else 0
+                os.unlink(entry.name, dir_fd=fd)
+                if progress is not None:
+                    progress.add(size, 1)
+    finally:
+        os.close(fd)
+    return subdirectories
+
+
+def walk_parallel(
+        root: str,
+        function: Callable[[str], Iterable[str]],
+        jobs: int,
+) -> list[str]:
+    """
+    Обход дерева, где function(каталог) обрабатывает каталог и возвращает его подкаталоги.
+    Каждый найденный подкаталог сразу уходит в пул из jobs потоков как отдельная задача, так что соседние поддеревья
+    обрабатываются параллельно. Задачи друг друга не ждут (ждет только главный поток), поэтому пул не может заблокироваться.
+    Возвращаем все каталоги в порядке обнаружения: родитель всегда раньше своих потомков.
+    """
+    directories = [root]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = {executor.submit(function, root)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for subdirectory in future.result():
+                        directories.append(subdirectory)
+                        pending.add(executor.submit(function, subdirectory))
+        finally:
+            for future in pending:
+                future.cancel()
+    return directories
+
+
+def remove_tree(path: PathLike[str] | str, progress: Progress | None = None, jobs: int = 1) -> None:
+    """
+    Удаление каталога со всем содержимым вместо shutil.rmtree. Сначала файлы: каждый каталог очищается через clear_directory,
+    на пуле из jobs потоков по поддеревьям (на сетевых и overlay файловых системах время уходит на задержку каждого вызова,
+    и потоки перекрывают эти ожидания). Потом сами каталоги, строго снизу вверх: в обратном порядке обнаружения
+    каждый каталог идет после всех своих потомков, так что к этому моменту он уже пуст.
+    Ссылки на каталоги удаляются как ссылки, внутрь не заходим.
+    """
+    path = os.fspath(path)
+    # Ссылку на каталог удаляем как ссылку: обход пошел бы по ней и вычистил бы чужой каталог (shutil.rmtree тут отказывается)
+    if os.path.islink(path):
+        os.unlink(path)
+        if progress is not None:
+            progress.add(files=1)
+        return
+    clear = partial(clear_directory, progress=progress)
+
+    if jobs == 1:
+        directories = []
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            directories.append(directory)
+            stack.extend(clear(directory))
+    else:
+        directories = walk_parallel(path, clear, jobs)
+
+    for directory in reversed(directories):
+        os.rmdir(directory)
@@ -0,0 +1,193 @@
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections.abc import Set as AbstractSet
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from shutil import copytree
+
+from src.enums.constants import TRASH_GC_JOBS, TRASH_MANIFEST
+from src.utils.copy import copy_file
+from src.utils.progress import Progress
+from src.utils.remove import remove_tree
+
+
+@dataclass
+class TrashEntry:
+    id: str
+    source: str
+    # None - размер еще не посчитан: put только переименовывает, а обход дерева делает measure (в потоке сборщика мусора)
+    size: int | None
+    time: float
+    type: str
+
+
+def tree_size(path: Path) -> int:
+    """Размер файла или каталога целиком. Только метаданные (lstat), содержимое не читается."""
+    if not path.is_dir() or path.is_symlink():
+        return path.lstat().st_size
+
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            total += os.lstat(os.path.join(dirpath, name)).st_size
+    return total
+
+
+def entry_type(path: Path) -> str:
+    if path.is_symlink():
+        return "symlink"
+    return "dir" if path.is_dir() else "file"
+
+
+class Trash:
+    """
+    Корзина .trash. Каждый удаленный объект лежит под своим uuid, так что имя выделяется сразу, без перебора занятых.
+    Что где лежит - записано в manifest.jsonl, который только дописывается: событие add (откуда, время, тип),
+    size (размер, когда его посчитали), restore или purge. Список, восстановление и очистка читают манифест, а не сканируют каталог.
+    Сборщик мусора работает в фоновом потоке, поэтому запись в манифест идет под блокировкой.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.manifest = directory / TRASH_MANIFEST
+        self.lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _log(self, event: str, **fields) -> None:
+        with self.lock, open(self.manifest, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"event": event, **fields}, ensure_ascii=False) + "\n")
+
+    def put(self, path: Path, progress: Progress | None = None) -> Path:
+        """
+        Перенос в корзину. Если корзина на той же файловой системе - это просто os.rename: мгновенно и без копии,
+        сколько бы ни весил каталог. Поэтому размер здесь не считаем (это обход всего дерева): его позже запишет measure.
+        Между разными устройствами rename не работает (EXDEV), тогда копируем через copy_file/copytree
+        (с отчетом в progress), а удалить оригинал должен уже вызывающий.
+        """
+        entry = TrashEntry(
+            id=uuid.uuid4().hex,
+            source=str(path.absolute()),
+            size=None,
+            time=time.time(),
+            type=entry_type(path),
+        )
+        target = self.directory / entry.id
+
+        try:
+            os.rename(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Копия и так обходит все дерево, так что размер заодно нужен для прогресса
+            entry.size = tree_size(path)
+            if progress is not None:
+                progress.expect(entry.size)
+            if path.is_file():
+                copy_file(path, target, progress=progress)
+            else:
+                copytree(path, target, symlinks=True, copy_function=partial(copy_file, progress=progress))
+
+        self._log("add", **asdict(entry))
+        return target
+
+    def entries(self) -> list[TrashEntry]:
+        """Объекты, которые сейчас лежат в корзине, от старых к новым - по манифесту."""
+        if not self.manifest.exists():
+            return []
+
+        live: dict[str, TrashEntry] = {}
+        with open(self.manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                event = record.pop("event", None)
+                if event == "add":
+                    live[record["id"]] = TrashEntry(**record)
+                elif event == "size":
+                    if record.get("id") in live:
+                        live[record["id"]].size = record["size"]
+                else:
+                    live.pop(record.get("id"), None)
+        return list(live.values())
+
+    def measure(self, entries: list[TrashEntry]) -> list[tuple[TrashEntry, int]]:
+        """
+        Пары (объект, размер). Размеры, которые put не записал, досчитываем и дописываем в манифест событием size,
+        чтобы считать один раз. Зовется из сборщика мусора (в фоне) и из trash -l, а не из rm.
+        """
+        result: list[tuple[TrashEntry, int]] = []
+        for entry in entries:
+            if entry.size is None:
+                path = self.directory / entry.id
+                entry.size = tree_size(path) if path.exists(follow_symlinks=False) else 0
+                self._log("size", id=entry.id, size=entry.size)
+            result.append((entry, entry.size))
+        return result
+
+    def restore(self, entry_id: str, destination: Path | None = None) -> Path:
+        """Возвращаем объект из корзины на старое место (или в destination)."""
+        entry = next((entry for entry in self.entries() if entry.id == entry_id), None)
+        if entry is None:
+            raise FileNotFoundError(f"trash: '{entry_id}': В корзине нет такого объекта")
+
+        target = destination or Path(entry.source)
+        shutil.move(self.directory / entry_id, target)
+        self._log("restore", id=entry_id)
+        return target
+
+    def expired(
+            self,
+            max_bytes: int | None,
+            max_age: float | None,
+            max_entries: int | None,
+            protected: AbstractSet[str] = frozenset(),
+    ) -> list[TrashEntry]:
+        """
+        Что выкинуть, чтобы уложиться в лимиты: идем от самых старых объектов и берем их, пока корзина больше max_bytes,
+        объектов больше max_entries или объект старше max_age секунд. Самый свежий объект не трогаем никогда,
+        чтобы последний rm всегда можно было отменить. Объекты из protected (на них ссылается журнал undo) тоже не трогаем.
+        """
+        entries = self.measure(self.entries())
+        total = sum(size for _, size in entries)
+        count = len(entries)
+        now = time.time()
+
+        result: list[TrashEntry] = []
+        for entry, size in entries[:-1]:
+            if entry.id in protected:
+                continue
+            too_big = max_bytes is not None and total > max_bytes
+            too_many = max_entries is not None and count > max_entries
+            too_old = max_age is not None and now - entry.time > max_age
+            if not (too_big or too_many or too_old):
+                break
+            result.append(entry)
+            total -= size
+            count -= 1
+        return result
+
+    def purge(self, entries: list[TrashEntry] | None = None) -> int:
+        """Окончательное удаление объектов (по умолчанию всех). Если корзина опустела - заодно обнуляем манифест."""
+        if entries is None:
+            entries = self.entries()
+
+        for entry in entries:
+            path = self.directory / entry.id
+            if path.is_dir() and not path.is_symlink():
+                remove_tree(path, jobs=TRASH_GC_JOBS)
+            elif path.exists(follow_symlinks=False):
+                path.unlink()
+            self._log("purge", id=entry.id)
+
+        with self.lock:
+            if not self.entries():
+                self.manifest.write_text("", encoding="utf-8")
+        return len(entries)
@@ -0,0 +1,214 @@
+import os
+import re
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+
+from src.enums.constants import INDEX_CHUNK_SIZE, INDEX_QUERY_TRIGRAMS
+
+TRIGRAM = re.compile(b".{3}", re.DOTALL)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_file ON trigrams (file_id);
+"""
+
+
+@dataclass
+class IndexStats:
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+def trigrams(data: bytes) -> set[bytes]:
+    """Все триграммы куска байтов. Три прохода findall со сдвигом 0, 1, 2 дают все окна по 3 байта, и все это в C."""
+    result: set[bytes] = set()
+    for offset in range(3):
+        result.update(TRIGRAM.findall(data, offset))
+    return result
+
+
+def file_trigrams(path: PathLike[str] | str) -> set[int]:
+    """
+    Триграммы файла (в нижнем ASCII-регистре, чтобы индексом можно было пользоваться и с -i).
+    Читаем кусками по INDEX_CHUNK_SIZE, два последних байта куска приклеиваем к следующему, чтобы не потерять стыки.
+    """
+    result: set[bytes] = set()
+    tail = b""
+    with open(path, "rb") as f:
+        while chunk := f.read(INDEX_CHUNK_SIZE):
+            data = tail + chunk.lower()
+            result |= trigrams(data)
+            tail = data[-2:]
+    return {int.from_bytes(trigram, "big") for trigram in result}
+
+
+def path_range(root: str) -> tuple[str, str]:
+    """Границы для выборки всех путей внутри каталога одним сравнением строк: '/' + 1 == '0'."""
+    prefix = root.rstrip("/") + "/"
+    return prefix, prefix[:-1] + "0"
+
+
+class TrigramIndex:
+    """
+    Опциональный триграммный индекс для grep -r, лежит в SQLite-файле .index в корне проекта.
+    Для каждого файла хранится mtime/size и набор триграмм его содержимого.
+    grep берет триграммы искомой строки и пропускает файлы, в которых хотя бы одной из них точно нет.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def update(self, root: PathLike[str] | str) -> IndexStats:
+        """
+        Инкрементальное обновление индекса каталога.
+        Файл перечитывается, только если у него поменялись mtime или размер. Исчезнувшие файлы из индекса удаляются.
+        """
+        root = str(Path(root).resolve())
+        stats = IndexStats()
+
+        with self._connect() as connection:
+            known = {
+                path: (file_id, mtime_ns, size)
+                for file_id, path, mtime_ns, size in connection.execute(
+                    "SELECT id, path, mtime_ns, size FROM files WHERE path >= ? AND path < ?", path_range(root)
+                )
+            }
+
+            for dirpath, _, filenames in os.walk(root):
+                for file in filenames:
+                    file_path = os.path.join(dirpath, file)
+                    try:
+                        file_stat = os.stat(file_path)
+                    except OSError:
+                        continue
+
+                    entry = known.pop(file_path, None)
+                    if entry is not None and entry[1:] == (file_stat.st_mtime_ns, file_stat.st_size):
+                        stats.unchanged += 1
+                        continue
+
+                    try:
+                        file_grams = file_trigrams(file_path)
+                    except OSError:
+                        continue
+
+                    if entry is not None:
+                        file_id = entry[0]
+                        connection.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+                        connection.execute(
+                            "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                            (file_stat.st_mtime_ns, file_stat.st_size, file_id),
+                        )
+                    else:
+                        file_id = connection.execute(
+                            "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                            (file_path, file_stat.st_mtime_ns, file_stat.st_size),
+                        ).lastrowid
+
+                    connection.executemany(
+                        "INSERT INTO trigrams (trigram, file_id) VALUES (?, ?)",
+                        ((trigram, file_id) for trigram in file_grams),
+                    )
+                    stats.updated += 1
+
+            for file_id, _, _ in known.values():
+                connection.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+                connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                stats.removed += 1
+
+        connection.close()
+        return stats
+
+    @staticmethod
+    def most_selective(connection: sqlite3.Connection, grams: list[int], limit: int = INDEX_QUERY_TRIGRAMS) -> list[int]:
+        """
+        Не больше limit самых редких триграмм из grams: у SQLite есть лимит на число параметров запроса,
+        а длинная строка дала бы по "?" на каждую триграмму. Частоты считаем пачками по limit через первичный ключ.
+        Файл с редкими триграммами почти наверняка нужно читать, так что отбор по части триграмм почти не добавляет кандидатов,
+        а лишний кандидат просто прочитается grep-ом.
+        """
+        if len(grams) <= limit:
+            return grams
+        counts: dict[int, int] = {}
+        for start in range(0, len(grams), limit):
+            batch = grams[start:start + limit]
+            placeholders = ", ".join("?" * len(batch))
+            counts.update(connection.execute(
+                f"SELECT trigram, COUNT(*) FROM trigrams WHERE trigram IN ({placeholders}) GROUP BY trigram", batch,
+            ))
+        return sorted(grams, key=lambda gram: counts.get(gram, 0))[:limit]
+
+    def file_filter(
+            self,
+            root: PathLike[str] | str,
+            needle: str,
+            ignore: bool,
+    ) -> Callable[[Path, Path], bool] | None:
+        """
+        Фильтр файлов для рекурсивного grep по строке needle: keep(file_path, relative_path) -> нужно ли читать файл.
+        Пропускаем только те файлы, что есть в индексе, не менялись с индексации и не содержат всех триграмм needle.
+        Все остальное (нет в индексе, изменилось) читается как обычно, так что индекс не может потерять совпадение.
+        Если индекса нет или он тут ничем не поможет - None.
+        """
+        raw = needle.encode("utf-8")
+        if not self.path.exists() or len(raw) < 3 or (ignore and not raw.isascii()):
+            return None
+
+        needle_grams = [int.from_bytes(trigram, "big") for trigram in trigrams(raw.lower())]
+        base = str(Path(root).resolve())
+        low, high = path_range(base)
+
+        with self._connect() as connection:
+            known = {
+                path[len(low):]: (mtime_ns, size)
+                for path, mtime_ns, size in connection.execute(
+                    "SELECT path, mtime_ns, size FROM files WHERE path >= ? AND path < ?", (low, high)
+                )
+            }
+            needle_grams = self.most_selective(connection, needle_grams)
+            hits = {
+                path[len(low):]
+                for (path,) in connection.execute(
+                    f"""
+                    SELECT f.path FROM trigrams t JOIN files f ON f.id = t.file_id
+                    WHERE t.trigram IN ({", ".join("?" * len(needle_grams))}) AND f.path >= ? AND f.path < ?
+                    GROUP BY t.file_id HAVING COUNT(*) = ?
+                    """,
+                    (*needle_grams, low, high, len(needle_grams)),
+                )
+            }
+        connection.close()
+
+        if not known:
+            return None
+
+        def keep(file_path: Path, relative_path: Path) -> bool:
+            entry = known.get(str(relative_path))
+            if entry is None or str(relative_path) in hits:
+                return True
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                return True
+            return (file_stat.st_mtime_ns, file_stat.st_size) != entry
+
+        return keep
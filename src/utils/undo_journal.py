@@ -0,0 +1,162 @@
+import json
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO
+
+from src.enums.constants import UNDO_DEPTH, UNDO_FSYNC_BATCH
+
+# Запись журнала: [длина payload][payload (JSON)][длина payload, crc32 payload, MAGIC]
+HEADER = struct.Struct("<I")
+FOOTER = struct.Struct("<II4s")
+MAGIC = b"UNDO"
+
+
+def pack_payload(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload)) + payload + FOOTER.pack(len(payload), zlib.crc32(payload), MAGIC)
+
+
+def pack_record(record: dict) -> bytes:
+    return pack_payload(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+
+class UndoJournal:
+    """
+    Стек undo на диске: бинарный лог, который переживает перезапуск консоли и одиночные вызовы python -m src.main.
+    Каждая запись обрамлена длиной с обеих сторон, а в хвосте еще crc32 и MAGIC. Поэтому последнюю запись можно прочитать
+    с конца файла, не читая остальные: push - дозапись в конец, pop - чтение хвоста и truncate. Оба O(1) при любом размере журнала.
+    Если процесс упал посреди записи, хвост окажется битым: тогда один раз проходим журнал с начала и обрезаем его
+    по последней целой записи.
+    После каждой записи данные сразу уходят в ОС (переживут падение процесса), а fsync делаем раз в fsync_batch записей,
+    на каждом pop и в close.
+    Отменить можно только последние depth команд, поэтому журнал не растет бесконечно: когда записей становится
+    вдвое больше depth, он сжимается до последних depth (см. _compact). Так компактизация стоит O(1) на push в среднем,
+    а records() читает не больше 2 * depth записей.
+    """
+
+    def __init__(self, path: Path, fsync_batch: int = UNDO_FSYNC_BATCH, depth: int = UNDO_DEPTH):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.depth = depth
+        self.pending = 0
+        self.path.touch(exist_ok=True)
+        with open(self.path, "rb") as f:
+            self.count = sum(1 for _ in self._scan(f))
+
+    def push(self, record: dict) -> None:
+        with open(self.path, "ab") as f:
+            f.write(pack_record(record))
+            f.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_batch:
+                os.fsync(f.fileno())
+                self.pending = 0
+        self.count += 1
+        if self.count > 2 * self.depth:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Оставляем в журнале только последние depth записей: пишем их во временный файл рядом и подменяем журнал через os.replace,
+        так что упавшая посреди компактизация оставляет старый журнал целым. Если в журнале есть битое место
+        (его обрежет ближайший pop), не трогаем ничего: записи после него иначе потерялись бы.
+        """
+        with open(self.path, "rb") as f:
+            scanned = list(self._scan(f))
+            if (scanned[-1][0] if scanned else 0) != os.fstat(f.fileno()).st_size:
+                return
+        keep = [payload for _, payload in scanned[len(scanned) - self.depth:]] if self.depth > 0 else []
+
+        temporary = self.path.with_name(f"{self.path.name}.compact")
+        with open(temporary, "wb") as f:
+            f.write(b"".join(pack_payload(payload) for payload in keep))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.count = len(keep)
+        self.pending = 0
+
+    def _last(self, f, size: int) -> tuple[int, dict] | None:
+        """Последняя запись и смещение ее начала. None, если хвост битый."""
+        if size < HEADER.size + FOOTER.size:
+            return None
+
+        f.seek(size - FOOTER.size)
+        length, crc, magic = FOOTER.unpack(f.read(FOOTER.size))
+        start = size - FOOTER.size - length - HEADER.size
+        if magic != MAGIC or start < 0:
+            return None
+
+        f.seek(start)
+        header = f.read(HEADER.size)
+        payload = f.read(length)
+        if HEADER.unpack(header)[0] != length or zlib.crc32(payload) != crc:
+            return None
+        return start, json.loads(payload)
+
+    @staticmethod
+    def _scan(f: IO[bytes]) -> Iterator[tuple[int, bytes]]:
+        """Целые записи с начала журнала: (смещение конца записи, payload). Идем, пока записи читаются и сходятся crc."""
+        f.seek(0)
+        end = 0
+        while len(header := f.read(HEADER.size)) == HEADER.size:
+            (length,) = HEADER.unpack(header)
+            payload = f.read(length)
+            footer = f.read(FOOTER.size)
+            if len(payload) != length or len(footer) != FOOTER.size:
+                break
+            if FOOTER.unpack(footer) != (length, zlib.crc32(payload), MAGIC):
+                break
+            end += HEADER.size + length + FOOTER.size
+            yield end, payload
+
+    def _valid_size(self, f: IO[bytes]) -> int:
+        """Длина целой части журнала."""
+        valid = 0
+        for valid, _ in self._scan(f):
+            pass
+        return valid
+
+    def records(self) -> list[dict]:
+        """
+        Все целые записи журнала от старых к новым (сборщику мусора корзины нужно знать, на какие бэкапы они ссылаются).
+        Читаем с начала до первой битой записи: недописанный прямо сейчас хвост просто не попадает в результат.
+        """
+        with open(self.path, "rb") as f:
+            return [json.loads(payload) for _, payload in self._scan(f)]
+
+    def pop(self) -> dict | None:
+        """Снимаем последнюю запись. Если журнал пуст - None."""
+        with open(self.path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return None
+
+            last = self._last(f, size)
+            if last is None:
+                size = self._valid_size(f)
+                f.truncate(size)
+                self.count = sum(1 for _ in self._scan(f))
+                last = self._last(f, size)
+                if last is None:
+                    f.truncate(0)
+                    os.fsync(f.fileno())
+                    self.count = 0
+                    return None
+
+            start, record = last
+            f.truncate(start)
+            os.fsync(f.fileno())
+            self.pending = 0
+            self.count = max(self.count - 1, 0)
+            return record
+
+    def close(self) -> None:
+        """Досбрасываем на диск записи, для которых еще не было fsync."""
+        if not self.pending:
+            return
+        with open(self.path, "ab") as f:
+            os.fsync(f.fileno())
+        self.pending = 0